@@ -0,0 +1,168 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+
+from telegram.error import BadRequest
+
+# Constants
+DEBOUNCE_SECONDS = float(os.getenv("CALLBACK_DEBOUNCE_SECONDS", "3"))
+MAX_RECENT_TAPS = 10000
+MAX_LIST_MESSAGES = 10000
+LIST_MESSAGE_TTL_SECONDS = 24 * 60 * 60  # Past this, a list is only pruned once the table is full
+
+# All state is touched from the event loop only, so no locking is needed.
+# Each user runs one handler at a time: callback taps beyond that are shed, commands wait their turn,
+# so concurrent updates never interleave writes to the same user_data.
+_in_flight = set()                 # (user_id, message_id, data) currently being handled
+_user_locks = {}                   # user_id -> asyncio.Lock held by that user's running handler
+_user_waiting = defaultdict(int)   # user_id -> handlers holding or waiting for the lock
+_recent_taps = {}                  # (user_id, message_id) -> (data, finished_at)
+_latest_list_message = {}          # (user_id, chat_id, family) -> (message_id, noted_at) of the newest list/menu
+admission_stats = Counter()
+
+
+def is_not_modified(error):
+    """True for Telegram's 'message is not modified' error, raised when a duplicate tap re-sends the same edit."""
+    return isinstance(error, BadRequest) and "not modified" in str(error).lower()
+
+
+async def report_callback_error(query, error, handler_name, text):
+    """Error fallback for callback handlers: log and edit the message into an error notice.
+
+    'message is not modified' is re-raised instead, so the admission wrapper counts and ignores it.
+    """
+    if is_not_modified(error):
+        raise error
+    logging.error(f"❌ Error in {handler_name}: {error}")
+    await query.edit_message_text(text)
+
+
+def remember_list_message(user_id, family, message):
+    """Record a newly sent list/menu message; taps on older messages of the same family are then dropped."""
+    if message is not None:
+        _note_list_message((user_id, message.chat_id, family), message.message_id)
+
+
+def _latest_list_id(key):
+    latest = _latest_list_message.get(key)
+    return latest[0] if latest else 0
+
+
+def _note_list_message(key, message_id):
+    # Message ids only grow within a chat, so a newer message always replaces the recorded one.
+    # The record is in memory only: after a restart the next list sent or tapped seeds it again.
+    if message_id > _latest_list_id(key):
+        now = time.monotonic()
+        _latest_list_message[key] = (message_id, now)
+        _prune_list_messages(now)
+
+
+def _prune_recent(now):
+    if len(_recent_taps) <= MAX_RECENT_TAPS:
+        return
+    for key, (_, finished_at) in list(_recent_taps.items()):
+        if now - finished_at > DEBOUNCE_SECONDS:
+            del _recent_taps[key]
+
+
+def _prune_list_messages(now):
+    if len(_latest_list_message) <= MAX_LIST_MESSAGES:
+        return
+    for key, (_, noted_at) in list(_latest_list_message.items()):
+        if now - noted_at > LIST_MESSAGE_TTL_SECONDS:
+            del _latest_list_message[key]
+
+
+def _rejection_reason(user_id, message_id, data, list_key, now):
+    if (user_id, message_id, data) in _in_flight:
+        return 'collapsed'
+    if list_key and message_id < _latest_list_id(list_key):
+        return 'superseded'
+    recent = _recent_taps.get((user_id, message_id))
+    if recent and recent[0] == data and now - recent[1] < DEBOUNCE_SECONDS:
+        # Same button on the same message just finished: the message has already moved on
+        return 'stale'
+    lock = _user_locks.get(user_id)
+    if lock and lock.locked():
+        return 'throttled'
+    return None
+
+
+async def _run_serialized(user_id, callback, update, context):
+    _user_waiting[user_id] += 1
+    lock = _user_locks.setdefault(user_id, asyncio.Lock())
+    try:
+        async with lock:
+            return await callback(update, context)
+    finally:
+        _user_waiting[user_id] -= 1
+        if not _user_waiting[user_id]:
+            del _user_waiting[user_id]
+            del _user_locks[user_id]
+
+
+# ✅ Admission Wrapper for Callback Handlers
+def admitted(callback, family=None):
+    """Shed duplicate, superseded, stale and over-limit callback taps before they reach the handler.
+
+    family groups the list/menu messages a handler edits ('players', 'earnings', 'stats');
+    taps on a message older than the user's newest one of that family in the same chat are dropped.
+    """
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        query = update.callback_query
+        user_id = update.effective_user.id if update.effective_user else 0
+        message_id = query.message.message_id if query.message else query.inline_message_id
+        key = (user_id, message_id, query.data)
+        list_key = (user_id, query.message.chat_id, family) if family and query.message else None
+        now = time.monotonic()
+
+        reason = _rejection_reason(user_id, message_id, query.data, list_key, now)
+        if reason:
+            admission_stats[reason] += 1
+            logging.info(f"🚦 Dropped {reason} tap {query.data!r} from user {user_id}")
+            if reason == 'throttled':
+                await query.answer("⏳ Still working on your last tap…")
+            elif reason == 'superseded':
+                await query.answer("This list is out of date, please use the latest one.")
+            else:
+                await query.answer()
+            return
+
+        admission_stats['admitted'] += 1
+        _in_flight.add(key)
+        try:
+            result = await _run_serialized(user_id, callback, update, context)
+            if list_key:
+                _note_list_message(list_key, message_id)
+            return result
+        except BadRequest as e:
+            if not is_not_modified(e):
+                raise
+            admission_stats['not_modified'] += 1
+        finally:
+            _in_flight.discard(key)
+            finished_at = time.monotonic()
+            _recent_taps[(user_id, message_id)] = (query.data, finished_at)
+            _prune_recent(finished_at)
+
+    return wrapper
+
+
+# ✅ Per-User Ordering for Command Handlers
+def serialized(callback):
+    """Run a command only after the same user's running handler finishes, never alongside it."""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        user_id = update.effective_user.id if update.effective_user else 0
+        return await _run_serialized(user_id, callback, update, context)
+
+    return wrapper
+
+
+def get_admission_stats():
+    """Counters of admitted and shed callback taps since startup."""
+    return dict(admission_stats, in_flight=len(_in_flight), users_busy=len(_user_locks))
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+import storage
+from google_sheets import (
+    get_sheet_snapshot,
+    get_cached_snapshot,
+    get_earnings_matrix,
+    register_refresh_listener,
+    clean_data,
+    CURRENT_SEASON
+)
+
+# Constants
+SUBSCRIPTION_KINDS = ['player', 'club', 'month']
+ALERT_POLL_SECONDS = int(os.getenv("ALERT_POLL_SECONDS", "600"))
+SEND_BATCH_SIZE = 25
+MESSAGES_PER_SECOND = 25  # Stay under Telegram's ~30 msg/s broadcast limit
+MAX_SEND_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30  # Doubled after every failed attempt
+MAX_LINES_PER_ALERT = 20
+FAILED_RETENTION_SECONDS = 24 * 60 * 60
+
+_conn = storage.connect()
+_db_lock = threading.Lock()
+_detect_lock = threading.Lock()
+
+storage.init_schema(_conn, [
+    """CREATE TABLE IF NOT EXISTS subscriptions (
+        chat_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        target TEXT NOT NULL DEFAULT '',
+        created_at REAL NOT NULL,
+        PRIMARY KEY (chat_id, kind, target)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_target ON subscriptions (kind, target)",
+    """CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL DEFAULT 0
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, id)",
+    "CREATE TABLE IF NOT EXISTS alert_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+])
+if 'next_attempt_at' not in {row['name'] for row in _conn.execute("PRAGMA table_info(outbox)")}:
+    with _conn:  # Outbox created before retries were backed off
+        _conn.execute("ALTER TABLE outbox ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+
+
+# ✅ Subscriptions
+def add_subscription(chat_id, kind, target=''):
+    """Subscribe a chat to a player, a club or the 'new month published' event."""
+    with _db_lock, _conn:
+        cursor = _conn.execute(
+            "INSERT OR IGNORE INTO subscriptions (chat_id, kind, target, created_at) VALUES (?, ?, ?, ?)",
+            (chat_id, kind, target.lower(), time.time())
+        )
+    return cursor.rowcount > 0
+
+
+def remove_subscription(chat_id, kind, target=''):
+    with _db_lock, _conn:
+        cursor = _conn.execute(
+            "DELETE FROM subscriptions WHERE chat_id = ? AND kind = ? AND target = ?",
+            (chat_id, kind, target.lower())
+        )
+    return cursor.rowcount > 0
+
+
+def get_subscriptions(chat_id):
+    with _db_lock:
+        rows = _conn.execute(
+            "SELECT kind, target FROM subscriptions WHERE chat_id = ? ORDER BY kind, target", (chat_id,)
+        ).fetchall()
+    return [(row['kind'], row['target']) for row in rows]
+
+
+def get_outbox_info():
+    """Outbox row counts by status plus the number of subscriptions."""
+    with _db_lock:
+        rows = _conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        subscriptions = _conn.execute("SELECT COUNT(*) AS n FROM subscriptions").fetchone()['n']
+    return dict({row['status']: row['n'] for row in rows}, subscriptions=subscriptions)
+
+
+# ✅ Change Detection (diff successive 'Earning Distribution' snapshots)
+# Keyed by season so a new season's sheet is never diffed against the previous season
+_STATE_KEY = f"earnings:{CURRENT_SEASON}"
+
+
+def _load_previous_snapshot():
+    with _db_lock:
+        row = _conn.execute("SELECT value FROM alert_state WHERE key = ?", (_STATE_KEY,)).fetchone()
+    return json.loads(row['value']) if row else None
+
+
+def _save_snapshot(matrix):
+    values = np.where(np.isnan(matrix.values), None, matrix.values).tolist()
+    state = {
+        'version': matrix.version,
+        'periods': matrix.periods,
+        'players': dict(zip(matrix.players, values))
+    }
+    with _db_lock, _conn:
+        _conn.execute(
+            "INSERT OR REPLACE INTO alert_state (key, value) VALUES (?, ?)", (_STATE_KEY, json.dumps(state))
+        )
+
+
+def detect_changes(previous, matrix):
+    """Return (newly published periods, {player: [(period, value), ...]}) between two snapshots."""
+    has_data = ~np.isnan(matrix.values)
+    new_periods = []
+    for j, period in enumerate(matrix.periods):
+        if not has_data[:, j].any():
+            continue
+        if period not in previous['periods']:
+            new_periods.append(period)
+            continue
+        k = previous['periods'].index(period)
+        if all(row[k] is None for row in previous['players'].values()):
+            new_periods.append(period)
+
+    changed = {}
+    for i, player in enumerate(matrix.players):
+        old_row = previous['players'].get(player)
+        old = dict(zip(previous['periods'], old_row)) if old_row else {}
+        updates = [
+            (period, round(float(value), 2))
+            for period, value, present in zip(matrix.periods, matrix.values[i], has_data[i])
+            if present and (old.get(period) is None or abs(old[period] - value) > 1e-9)
+        ]
+        if updates:
+            changed[player] = updates
+    return new_periods, changed
+
+
+def _club_by_player():
+    _, players_df = get_cached_snapshot("Player List")
+    if players_df is None:
+        _, players_df = get_sheet_snapshot("Player List")
+    players_df = clean_data(players_df.copy())
+    return dict(zip(players_df['Player'], players_df['Club'].str.lower()))
+
+
+def _queue_alerts(new_periods, changed):
+    """Group every change per subscribed chat and queue one message per chat."""
+    lines_by_chat = {}
+    with _db_lock:
+        subscriptions = _conn.execute("SELECT chat_id, kind, target FROM subscriptions").fetchall()
+
+    by_target = {}
+    for row in subscriptions:
+        by_target.setdefault((row['kind'], row['target']), []).append(row['chat_id'])
+
+    for period in new_periods:
+        for chat_id in by_target.get(('month', ''), []):
+            lines_by_chat.setdefault(chat_id, []).append(f"🗓️ New earnings published for *{period}*")
+
+    club_of = _club_by_player() if any(kind == 'club' for kind, _ in by_target) else {}
+    for player, updates in changed.items():
+        latest_period, latest_value = updates[-1]
+        line = f"📈 *{player}* - {latest_period}: {latest_value} sTLOS"
+        chats = set(by_target.get(('player', player.lower()), []))
+        chats.update(by_target.get(('club', club_of.get(player, '')), []))
+        for chat_id in chats:
+            lines_by_chat.setdefault(chat_id, []).append(line)
+
+    now = time.time()
+    rows = []
+    for chat_id, lines in lines_by_chat.items():
+        text = "🔔 *Earnings update*\n\n" + "\n".join(lines[:MAX_LINES_PER_ALERT])
+        if len(lines) > MAX_LINES_PER_ALERT:
+            text += f"\n…and {len(lines) - MAX_LINES_PER_ALERT} more"
+        rows.append((chat_id, text, now))
+
+    with _db_lock, _conn:
+        _conn.executemany("INSERT INTO outbox (chat_id, text, created_at) VALUES (?, ?, ?)", rows)
+    logging.info(f"🔔 Queued {len(rows)} alerts ({len(new_periods)} new periods, {len(changed)} changed players)")
+
+
+def _on_refresh(sheet_name, version):
+    if sheet_name != "Earning Distribution":
+        return
+    # Load, diff, queue and save as one step so concurrent refreshes can't queue the same alerts twice.
+    # The matrix comes from the snapshot just loaded: fetching here could re-enter this listener.
+    with _detect_lock:
+        matrix = get_earnings_matrix(get_cached_snapshot("Earning Distribution"))
+        previous = _load_previous_snapshot()
+        if previous and previous['version'] == matrix.version:
+            return
+
+        if previous:
+            new_periods, changed = detect_changes(previous, matrix)
+            if new_periods or changed:
+                _queue_alerts(new_periods, changed)
+        else:
+            logging.info("🔔 Stored first earnings snapshot; alerts start from the next change")
+        _save_snapshot(matrix)
+
+
+register_refresh_listener(_on_refresh)
+
+
+# ✅ Background Tasks (started from Application.post_init)
+async def poll_for_changes():
+    """Force a snapshot refresh periodically so changes are detected without user traffic."""
+    while True:
+        await asyncio.sleep(ALERT_POLL_SECONDS)
+        try:
+            await asyncio.to_thread(get_sheet_snapshot, "Earning Distribution", True)
+        except Exception as e:
+            logging.error(f"❌ Error polling for earnings changes: {e}")
+
+
+def _fetch_pending(limit):
+    with _db_lock:
+        return _conn.execute(
+            "SELECT id, chat_id, text, attempts FROM outbox"
+            " WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+
+
+def _checkpoint(sent, failed, retry):
+    """Record a batch's outcome in one transaction so a restart resumes after the last checkpoint."""
+    with _db_lock, _conn:
+        _conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in sent])
+        _conn.executemany("UPDATE outbox SET status = 'failed' WHERE id = ?", [(i,) for i in failed])
+        _conn.executemany(
+            "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? + ? * (1 << attempts) WHERE id = ?",
+            [(time.time(), RETRY_BACKOFF_SECONDS, i) for i in retry]
+        )
+        _conn.execute(
+            "DELETE FROM outbox WHERE status = 'failed' AND created_at < ?", (time.time() - FAILED_RETENTION_SECONDS,)
+        )
+
+
+def _drop_chat(chat_id):
+    with _db_lock, _conn:
+        _conn.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+        _conn.execute("DELETE FROM outbox WHERE chat_id = ? AND status = 'pending'", (chat_id,))
+
+
+async def run_alert_sender(bot):
+    """Drain the outbox in rate-limited batches; pending rows survive restarts."""
+    interval = 1 / MESSAGES_PER_SECOND
+    while True:
+        try:
+            batch = await asyncio.to_thread(_fetch_pending, SEND_BATCH_SIZE)
+            if not batch:
+                await asyncio.sleep(5)
+                continue
+
+            sent, failed, retry = [], [], []
+            dropped = set()
+            for row in batch:
+                if row['chat_id'] in dropped:
+                    continue
+                try:
+                    await bot.send_message(chat_id=row['chat_id'], text=row['text'], parse_mode="Markdown")
+                    sent.append(row['id'])
+                except RetryAfter as e:
+                    logging.warning(f"⏳ Flood control, pausing alerts for {e.retry_after}s")
+                    await asyncio.sleep(float(e.retry_after))
+                    break
+                except Forbidden:
+                    # User blocked the bot; stop sending to them
+                    failed.append(row['id'])
+                    dropped.add(row['chat_id'])
+                    await asyncio.to_thread(_drop_chat, row['chat_id'])
+                except TelegramError as e:
+                    logging.warning(f"⚠️ Alert to {row['chat_id']} failed: {e}")
+                    if row['attempts'] + 1 >= MAX_SEND_ATTEMPTS:
+                        failed.append(row['id'])
+                    else:
+                        retry.append(row['id'])
+                await asyncio.sleep(interval)
+
+            await asyncio.to_thread(_checkpoint, sent, failed, retry)
+            logging.info(f"🔔 Alert batch: {len(sent)} sent, {len(failed)} failed, {len(retry)} to retry")
+        except Exception as e:
+            logging.error(f"❌ Error in alert sender: {e}")
+            await asyncio.sleep(5)
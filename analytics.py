@@ -0,0 +1,83 @@
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from google_sheets import (
+    get_sheet_snapshot,
+    get_earnings_matrix,
+    register_refresh_listener,
+    clean_data
+)
+
+# Constants
+ROLLUP_FIELDS = ['Club', 'Country', 'Rarity']
+
+_rollups = None
+_rollup_lock = threading.Lock()
+
+
+# ✅ Build Rollup Tables (Club / Country / Rarity)
+def _build_rollups(players_df, matrix):
+    df = clean_data(players_df.copy())
+    df = df[
+        (~df['Club'].str.contains('Retired', case=False, na=False)) &
+        (~df['Country'].str.contains('Retired', case=False, na=False)) &
+        (df['Player'] != '')
+    ].copy()
+
+    # Current season earnings = sum of every period in 'Earning Distribution'
+    season = pd.Series(np.nansum(matrix.values, axis=1), index=matrix.players)
+    season = season[~season.index.duplicated()]
+    df['Season'] = df['Player'].map(season).fillna(0.0)
+    df['Total Earnings'] = pd.to_numeric(
+        df['Total Earnings'].astype(str).str.replace(r'[^\d.]', '', regex=True), errors='coerce'
+    ).fillna(0.0)
+
+    tables = {}
+    for field in ROLLUP_FIELDS:
+        grouped = df[df[field] != ''].groupby(field)
+        table = grouped.agg(
+            players=('Player', 'size'),
+            total=('Season', 'sum'),
+            mean=('Season', 'mean'),
+            median=('Season', 'median'),
+            alltime=('Total Earnings', 'sum')
+        )
+        table['top_earner'] = df.loc[grouped['Season'].idxmax(), 'Player'].to_numpy()
+        table = table.sort_values('total', ascending=False).round(2)
+        tables[field] = table.reset_index().rename(columns={field: 'group'}).to_dict('records')
+    return tables
+
+
+def get_rollups():
+    """Return precomputed rollups, rebuilding them only when either sheet's data version changes."""
+    global _rollups
+    players_version, players_df = get_sheet_snapshot("Player List")
+    matrix = get_earnings_matrix()
+    version = (players_version, matrix.version)
+
+    with _rollup_lock:
+        if _rollups is None or _rollups['version'] != version:
+            _rollups = {'version': version, 'tables': _build_rollups(players_df, matrix)}
+            logging.info(f"✅ Rebuilt earnings rollups for data version {version}")
+        return _rollups
+
+
+def _on_refresh(sheet_name, version):
+    if sheet_name in ("Player List", "Earning Distribution"):
+        get_rollups()
+
+
+register_refresh_listener(_on_refresh)
+
+
+# ✅ Group Leaderboard (paginated view of a rollup table)
+def get_group_leaderboard(field, page=0, items_per_page=10):
+    """Retrieve one page of a Club, Country or Rarity leaderboard sorted by season earnings."""
+    if field not in ROLLUP_FIELDS:
+        return []
+    table = get_rollups()['tables'][field]
+    start = page * items_per_page
+    return table[start:start + items_per_page]
@@ -1,20 +1,68 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.constants import ChatAction
+from telegram.error import TelegramError
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, Updater
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 import logging
 from google_sheets import (
-    get_player_info,
     get_all_players,
-    get_unique_values,
     get_players_by_filter,
     get_retired_players,
     get_players_alphabetically,
+    get_snapshot_info,
+    CURRENT_SEASON
+)
+from pipeline import (
+    get_player_info,
+    get_unique_values,
     get_top_earners,
     get_current_season_earners,
-    get_player_earnings_chart,
-    get_march_earnings
+    get_march_earnings,
+    get_published,
+    get_trends,
+    start_pipeline
+)
+from charts import (
+    render_players_chart,
+    render_group_chart,
+    resolve_players,
+    get_chart_cache_info,
+    MAX_COMPARE_PLAYERS,
+    GROUP_FIELDS
 )
+from analytics import get_group_leaderboard
+from persistence import SQLitePersistence
+from admission import admitted, serialized, remember_list_message, report_callback_error, get_admission_stats
+from trends import trend_marker, get_biggest_movers
+from profiling import sample_stacks, memory_diff, stop_memory_tracing, MAX_PROFILE_SECONDS
+from export import (
+    build_export,
+    export_key,
+    get_cached_file_id,
+    remember_file_id,
+    forget_file_id,
+    get_export_cache_info,
+    EXPORT_TABLES,
+    EXPORT_FORMATS,
+    EXPORT_FILTER_FIELDS,
+    XLSX_AVAILABLE
+)
+from history import get_career_earnings, get_career_leaderboard, ingest_closed_seasons
+from alerts import (
+    add_subscription,
+    remove_subscription,
+    get_subscriptions,
+    run_alert_sender,
+    poll_for_changes,
+    get_outbox_info,
+    SUBSCRIPTION_KINDS
+)
+import asyncio
+import functools
+import io
+import json
 import os
+import time
 
 # ✅ Enable Logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +72,13 @@ TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
 # Constants
 ITEMS_PER_PAGE = 10
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))  # Across users; each user runs one at a time
+ADMIN_USER_IDS = {int(uid) for uid in os.getenv("ADMIN_USER_IDS", "").split(',') if uid.strip()}
+FILTER_FIELDS = {
+    'filter_club': 'Club',
+    'filter_rarity': 'Rarity',
+    'filter_country': 'Country'
+}
 
 
 # ✅ /players Command
@@ -36,7 +91,8 @@ async def players_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("👴 Retired Players", callback_data='filter_retired')]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("How would you like to view the players?", reply_markup=reply_markup)
+    message = await update.message.reply_text("How would you like to view the players?", reply_markup=reply_markup)
+    remember_list_message(update.effective_user.id, 'players', message)
 
 
 # ✅ Handle Sorting & Filter Selection
@@ -49,25 +105,19 @@ async def handle_sort_or_filter_selection(update: Update, context: ContextTypes.
 
     try:
         if action == 'sort_alpha':
-            players = get_players_alphabetically()
+            players = await asyncio.to_thread(load_players_list, action)
 
             if not players:
                 await query.edit_message_text("❌ No players found.")
                 return
 
             logging.info(f"✅ Found {len(players)} players (Alphabetically)")
-            context.user_data['players_list'] = players
-            context.user_data['current_page'] = 0
+            remember_players_list(context, action, players)
             await send_player_list(update, context, players, page=0)
 
         elif action in ['filter_club', 'filter_rarity', 'filter_country']:
-            field_map = {
-                'filter_club': 'Club',
-                'filter_rarity': 'Rarity',
-                'filter_country': 'Country'
-            }
-            field = field_map[action]
-            options = get_unique_values(field)
+            field = FILTER_FIELDS[action]
+            options = await asyncio.to_thread(get_unique_values, field)
 
             if not options:
                 await query.edit_message_text(f"❌ No options found for {field}.")
@@ -82,35 +132,59 @@ async def handle_sort_or_filter_selection(update: Update, context: ContextTypes.
             await send_filter_options(update, context, options, 0, field)
 
         elif action == 'filter_retired':
-            retired_df = get_retired_players()
-            players = retired_df["Player"].dropna().tolist()
+            players = await asyncio.to_thread(load_players_list, action)
             logging.info(f"Retired players found: {players}")
 
             if not players:
                 await query.edit_message_text("❌ No retired players found.")
                 return
 
-            context.user_data['players_list'] = players
-            context.user_data['current_page'] = 0
+            remember_players_list(context, action, players)
             await send_player_list(update, context, players, page=0)
 
         elif action == 'filter_all':
-            df = get_all_players()
-            players = df["Player"].dropna().tolist()
-            players.sort()  # Sort alphabetically
+            players = await asyncio.to_thread(load_players_list, action)
             logging.info(f"All players found: {len(players)}")
 
             if not players:
                 await query.edit_message_text("❌ No players found.")
                 return
 
-            context.user_data['players_list'] = players
-            context.user_data['current_page'] = 0
+            remember_players_list(context, action, players)
             await send_player_list(update, context, players, page=0)
 
     except Exception as e:
-        logging.error(f"❌ Error in handle_sort_or_filter_selection: {e}")
-        await query.edit_message_text("❌ An error occurred. Please try again.")
+        await report_callback_error(query, e, 'handle_sort_or_filter_selection', "❌ An error occurred. Please try again.")
+
+
+# ✅ Player List Sources (compact cursors that survive restarts)
+def load_players_list(source):
+    """Build the player list for a source such as 'filter_all' or 'filter_club_value_Arsenal'."""
+    if source == 'sort_alpha':
+        return get_players_alphabetically()
+    if source == 'filter_retired':
+        return get_retired_players()["Player"].dropna().tolist()
+    if source == 'filter_all':
+        df = get_all_players()
+        return sorted(df["Player"].dropna().tolist()) if not df.empty else []
+    if '_value_' in source:
+        filter_type, filter_value = source.split('_value_')
+        field = FILTER_FIELDS.get(filter_type)
+        return get_players_by_filter(field, filter_value) if field else []
+    return []
+
+def remember_players_list(context, source, players):
+    context.user_data['players_list'] = players
+    context.user_data['players_source'] = source
+    context.user_data['current_page'] = 0
+
+async def get_players_list(context):
+    """Return the user's current player list, rebuilding it from its source after a restart."""
+    players = context.user_data.get('players_list')
+    if players is None and context.user_data.get('players_source'):
+        players = await asyncio.to_thread(load_players_list, context.user_data['players_source'])
+        context.user_data['players_list'] = players
+    return players
 
 
 # ✅ Handle Filter Value Selection
@@ -124,30 +198,22 @@ async def handle_filter_value_selection(update: Update, context: ContextTypes.DE
         action = query.data
         if '_value_' in action:
             filter_type, filter_value = action.split('_value_')
-
-            field_map = {
-                'filter_club': 'Club',
-                'filter_rarity': 'Rarity',
-                'filter_country': 'Country'
-            }
-            field = field_map.get(filter_type)
+            field = FILTER_FIELDS.get(filter_type)
 
             logging.info(f"Filtering by {field}: {filter_value}")
 
-            players = get_players_by_filter(field, filter_value)
+            players = await asyncio.to_thread(load_players_list, action)
 
             if not players:
                 await query.edit_message_text(f"❌ No players found for {filter_value}.")
                 return
 
             logging.info(f"✅ Players found for {filter_value}: {players}")
-            context.user_data['players_list'] = players
-            context.user_data['current_page'] = 0
+            remember_players_list(context, action, players)
             await send_player_list(update, context, players, page=0)
 
     except Exception as e:
-        logging.error(f"❌ Error in handle_filter_value_selection: {e}")
-        await query.edit_message_text("❌ An error occurred while filtering players.")
+        await report_callback_error(query, e, 'handle_filter_value_selection', "❌ An error occurred while filtering players.")
 
 
 async def send_filter_options(update, context, options, page, field):
@@ -219,7 +285,7 @@ async def handle_player_selection(update: Update, context: ContextTypes.DEFAULT_
 
     try:
         player_name = query.data.split('_', 1)[1]
-        player_info = get_player_info(player_name)
+        player_info = await asyncio.to_thread(get_player_info, player_name)
 
         if player_info:
             info_text, video_link = player_info
@@ -233,8 +299,7 @@ async def handle_player_selection(update: Update, context: ContextTypes.DEFAULT_
             await query.message.reply_text(f"❌ No data found for {player_name}.", parse_mode="Markdown")
 
     except Exception as e:
-        logging.error(f"❌ Error in handle_player_selection: {e}")
-        await query.edit_message_text("❌ An error occurred while loading player details.")
+        await report_callback_error(query, e, 'handle_player_selection', "❌ An error occurred while loading player details.")
 
 
 # ✅ Handle Player Command
@@ -244,7 +309,7 @@ async def player_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please provide a player name. Example: /player Lionel Messi")
         return
 
-    player_info = get_player_info(player_name)
+    player_info = await asyncio.to_thread(get_player_info, player_name)
     if player_info:
         info_text, video_link = player_info
         keyboard = [[InlineKeyboardButton("📈 View Earnings Chart", callback_data=f'chart_{player_name}')]]
@@ -264,11 +329,12 @@ async def handle_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE):
     direction, page = query.data.split('_page_')
     page = int(page)
 
-    if 'players_list' not in context.user_data:
+    players = await get_players_list(context)
+    if not players:
         await query.edit_message_text("❌ No player list available.")
         return
 
-    players = context.user_data['players_list']
+    context.user_data['current_page'] = page
     await send_player_list(update, context, players, page)
 
 # ✅ Start Command
@@ -281,6 +347,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "📋 */players* - Browse all players\n"
         "💰 */earnings* - View top earners\n"
         "📈 */chart <name>* - View player's earnings chart\n"
+        "⚖️ */compare <name>, <name>* - Compare players' earnings\n"
+        "📊 */stats* - Club, country and rarity leaderboards\n"
+        "🔔 */subscribe* - Get notified when new earnings land\n"
+        "🏆 */career <name>* - Earnings across all seasons\n"
+        "📤 */export* - Download full player or earnings tables\n"
         "❓ */help* - See detailed usage instructions\n\n"
         "Try */players* to start exploring!"
     )
@@ -290,11 +361,13 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def earnings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
         [InlineKeyboardButton("💰 All-Time Top Earners", callback_data='earnings_alltime_0')],
-        [InlineKeyboardButton("📈 2024/25 Top Earners", callback_data='earnings_current_0')],
-        [InlineKeyboardButton("🗓️ March 2025 Top Earners", callback_data='earnings_march_0')]
+        [InlineKeyboardButton(f"📈 {CURRENT_SEASON} Top Earners", callback_data='earnings_current_0')],
+        [InlineKeyboardButton("🗓️ March 2025 Top Earners", callback_data='earnings_march_0')],
+        [InlineKeyboardButton("🚀 Biggest Movers", callback_data='earnings_movers_0')]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("View top earners:", reply_markup=reply_markup)
+    message = await update.message.reply_text("View top earners:", reply_markup=reply_markup)
+    remember_list_message(update.effective_user.id, 'earnings', message)
 
 async def handle_earnings_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -304,22 +377,23 @@ async def handle_earnings_list(update: Update, context: ContextTypes.DEFAULT_TYP
     page = int(page)
 
     if type_ == 'alltime':
-        earners = get_top_earners(page)
+        earners = await asyncio.to_thread(get_top_earners, page)
         title = "💰 All-Time Top Earners"
         note = "_Earnings are the total $USD value taking in the current sTLOS price_"
         next_callback = f'earnings_alltime_{page+1}'
         prev_callback = f'earnings_alltime_{page-1}'
     elif type_ == 'current':
-        earners = get_current_season_earners(page)
-        title = "📈 2024/25 Season Top Earners"
-        note = "_2024/25 season earnings are paid in sTLOS_"
+        earners = await asyncio.to_thread(get_current_season_earners, page)
+        title = f"📈 {CURRENT_SEASON} Season Top Earners"
+        note = f"_{CURRENT_SEASON} season earnings are paid in sTLOS_"
         next_callback = f'earnings_current_{page+1}'
         prev_callback = f'earnings_current_{page-1}'
-        # Add fire emoji to top earner if this is the first page
-        if page == 0 and earners:
-            earners[0]['is_top'] = True
+        # 🔥 hot in the latest period, ⬆️/⬇️ season rank movement since the previous month
+        trends = await asyncio.to_thread(get_trends)
+        for player in earners:
+            player['trend'] = trend_marker(trends, player['Player'])
     elif type_ == 'march':
-        earners = get_march_earnings(page)
+        earners = await asyncio.to_thread(get_march_earnings, page)
         if not earners:
             await query.edit_message_text("❌ No earnings data available.")
             return
@@ -347,6 +421,32 @@ async def handle_earnings_list(update: Update, context: ContextTypes.DEFAULT_TYP
         else:
             await query.edit_message_text(message, parse_mode="Markdown")
         return
+    elif type_ == 'movers':
+        trends = await asyncio.to_thread(get_trends)
+        if not trends['period']:
+            await query.edit_message_text("❌ No earnings data available.")
+            return
+
+        risers, fallers = get_biggest_movers(trends, 'month')
+        message = f"*🚀 Biggest Movers*\n_Season rank change from {trends['previous']} to {trends['period']}_\n\n"
+        message += "*⬆️ Risers*\n"
+        for player in risers:
+            streak = f" ({player['streak']} in a row)" if player['streak'] > 1 else ""
+            message += f"• *{player['player']}* #{player['rank']} (+{player['month_change']}){streak}\n"
+        message += "\n*⬇️ Fallers*\n"
+        for player in fallers:
+            streak = f" ({-player['streak']} in a row)" if player['streak'] < -1 else ""
+            message += f"• *{player['player']}* #{player['rank']} ({player['month_change']}){streak}\n"
+
+        if trends['week_since']:
+            risers, fallers = get_biggest_movers(trends, 'week')
+            since = time.strftime('%b %d', time.localtime(trends['week_since']))
+            message += f"\n*📅 This Week*\n_Season rank change since {since}_\n"
+            for player in risers + fallers:
+                message += f"• *{player['player']}* #{player['rank']} ({player['week_change']:+d})\n"
+
+        await query.edit_message_text(message, parse_mode="Markdown")
+        return
     else:
         return
 
@@ -356,13 +456,9 @@ async def handle_earnings_list(update: Update, context: ContextTypes.DEFAULT_TYP
 
     message = f"*{title}*\n{note}\n\n"
     for i, player in enumerate(earners, 1):
-        if type_ == 'february':
-            earnings = player.get('February', 0)
-            message += f"{i}. *{player['Player']}* - {earnings} sTLOS\n"
-        else:
-            earnings = player.get('Total Earnings' if type_ == 'alltime' else 'Total minus Ballon d\'Or', 0)
-            fire_emoji = " 🔥" if type_ == 'current' and player.get('top_february') else ""
-            message += f"{i}. *{player['Player']}* - {earnings}{fire_emoji}\n"
+        earnings = player.get('Total Earnings' if type_ == 'alltime' else 'Total minus Ballon d\'Or', 0)
+        trend = f" {player['trend']}" if player.get('trend') else ""
+        message += f"{i}. *{player['Player']}* - {earnings}{trend}\n"
 
     keyboard = []
     if page > 0:
@@ -390,17 +486,341 @@ async def chart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please provide a player name. Example: /chart Lionel Messi")
         return
 
-    # Get original player name with correct case from database
-    player_info = get_player_info(player_name)
-    if player_info:
-        original_name = player_info[0].split('*')[1].strip()  # Extract name from info text
-        chart = get_player_earnings_chart(original_name)
+    try:
+        # Get original player name with correct case from database
+        player_info = await asyncio.to_thread(get_player_info, player_name)
+        chart = None
+        if player_info:
+            original_name = player_info[0].split('*')[1].strip()  # Extract name from info text
+            chart = await asyncio.to_thread(render_players_chart, [original_name])
+
         if chart:
             keyboard = [[InlineKeyboardButton(original_name, callback_data=f'player_{original_name}')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await message.reply_photo(photo=chart, caption=f"📈 Earnings chart for {player_name}", reply_markup=reply_markup)
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            await message.reply_photo(photo=chart, caption=f"📈 Earnings chart for {player_name}", reply_markup=reply_markup)
+        else:
+            await message.reply_text(f"❌ No data found for {player_name}")
+    except Exception as e:
+        logging.error(f"❌ Error in chart_command: {e}")
+        await message.reply_text("❌ An error occurred while building the chart.")
+
+# ✅ /compare Command
+async def compare_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send one chart comparing several players, e.g. /compare Messi, Ronaldo, Mbappe."""
+    args = ' '.join(context.args)
+    layout = 'overlay'
+    if args.startswith('grid '):
+        layout, args = 'grid', args[len('grid '):]
+
+    names = [name.strip() for name in args.split(',') if name.strip()]
+    if len(names) < 2:
+        await update.message.reply_text("Please provide at least two players. Example: /compare Lionel Messi, Cristiano Ronaldo")
+        return
+    if len(names) > MAX_COMPARE_PLAYERS:
+        await update.message.reply_text(f"❌ You can compare up to {MAX_COMPARE_PLAYERS} players at once.")
+        return
+
+    try:
+        _, found, missing = await asyncio.to_thread(resolve_players, names)
+        if not found:
+            await update.message.reply_text("❌ None of those players were found.")
+            return
+
+        chart = await asyncio.to_thread(render_players_chart, found, layout)
+        caption = f"📈 Earnings comparison: {', '.join(found)}"
+        if missing:
+            caption += f"\n⚠️ Not found: {', '.join(missing)}"
+        await update.message.reply_photo(photo=chart, caption=caption)
+    except Exception as e:
+        logging.error(f"❌ Error in compare_command: {e}")
+        await update.message.reply_text("❌ An error occurred while building the comparison chart.")
+
+# ✅ /groupchart Command
+async def groupchart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send aggregate earnings per period for each rarity tier or the top clubs."""
+    group = context.args[0].lower() if context.args else ''
+    if group not in GROUP_FIELDS:
+        await update.message.reply_text("Please choose a group. Example: /groupchart rarity or /groupchart club")
+        return
+
+    try:
+        chart = await asyncio.to_thread(render_group_chart, group)
+        if not chart:
+            await update.message.reply_text("❌ No earnings data available.")
+            return
+        await update.message.reply_photo(photo=chart, caption=f"📊 Earnings by {GROUP_FIELDS[group]}")
+    except Exception as e:
+        logging.error(f"❌ Error in groupchart_command: {e}")
+        await update.message.reply_text("❌ An error occurred while building the group chart.")
+
+# ✅ /stats Command
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    field = context.args[0].lower() if context.args else ''
+    if field in ['club', 'country', 'rarity']:
+        try:
+            message, reply_markup = await build_stats_page(field, 0)
+            sent = await update.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+            remember_list_message(update.effective_user.id, 'stats', sent)
+        except Exception as e:
+            logging.error(f"❌ Error in stats_command: {e}")
+            await update.message.reply_text("❌ An error occurred while loading statistics.")
+        return
+
+    keyboard = [
+        [InlineKeyboardButton("🏟️ Club Leaderboard", callback_data='stats_club_0')],
+        [InlineKeyboardButton("🌍 Country Leaderboard", callback_data='stats_country_0')],
+        [InlineKeyboardButton("⭐ Rarity Leaderboard", callback_data='stats_rarity_0')]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    message = await update.message.reply_text("View earnings by group:", reply_markup=reply_markup)
+    remember_list_message(update.effective_user.id, 'stats', message)
+
+async def build_stats_page(field, page):
+    rows = await asyncio.to_thread(get_group_leaderboard, field.capitalize(), page, ITEMS_PER_PAGE)
+    if not rows:
+        return "❌ No statistics available.", None
+
+    message = f"*📊 {CURRENT_SEASON} Earnings by {field.capitalize()}*\n_Season earnings in sTLOS_\n\n"
+    for i, row in enumerate(rows, page * ITEMS_PER_PAGE + 1):
+        message += (
+            f"{i}. *{row['group']}* - {row['total']:,.2f} sTLOS\n"
+            f"    👥 {row['players']} players | avg {row['mean']:,.2f} | median {row['median']:,.2f}\n"
+            f"    🔥 Top: {row['top_earner']} | 💰 All-time ${row['alltime']:,.2f}\n"
+        )
+
+    keyboard = []
+    if page > 0:
+        keyboard.append(InlineKeyboardButton("⬅️ Previous", callback_data=f'stats_{field}_{page-1}'))
+    if len(rows) == ITEMS_PER_PAGE:
+        keyboard.append(InlineKeyboardButton("➡️ Next", callback_data=f'stats_{field}_{page+1}'))
+    reply_markup = InlineKeyboardMarkup([keyboard]) if keyboard else None
+    return message, reply_markup
+
+async def handle_stats_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    try:
+        _, field, page = query.data.split('_')
+        message, reply_markup = await build_stats_page(field, int(page))
+        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+    except Exception as e:
+        await report_callback_error(query, e, 'handle_stats_list', "❌ An error occurred while loading statistics.")
+
+# ✅ /subscribe, /unsubscribe & /subscriptions Commands
+async def resolve_subscription_target(kind, target):
+    """Return the canonical player/club name for a subscription, or None if unknown."""
+    if kind == 'month':
+        return ''
+    if kind == 'player':
+        _, found, _ = await asyncio.to_thread(resolve_players, [target])
+        return found[0] if found else None
+    clubs = await asyncio.to_thread(get_unique_values, 'Club')
+    matches = [club for club in clubs if club.lower() == target.lower()]
+    return matches[0] if matches else None
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    kind = context.args[0].lower() if context.args else ''
+    target = ' '.join(context.args[1:])
+    if kind not in SUBSCRIPTION_KINDS or (kind != 'month' and not target):
+        await update.message.reply_text(
+            "Usage:\n/subscribe player <name>\n/subscribe club <club>\n/subscribe month"
+        )
+        return
+
+    name = await resolve_subscription_target(kind, target)
+    if name is None:
+        await update.message.reply_text(f"❌ No {kind} found named {target}.")
+        return
+
+    added = await asyncio.to_thread(add_subscription, update.effective_chat.id, kind, name)
+    label = "new monthly earnings" if kind == 'month' else name
+    if added:
+        await update.message.reply_text(f"🔔 Subscribed to {label}.")
+    else:
+        await update.message.reply_text(f"ℹ️ You're already subscribed to {label}.")
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    kind = context.args[0].lower() if context.args else ''
+    target = ' '.join(context.args[1:])
+    if kind not in SUBSCRIPTION_KINDS:
+        await update.message.reply_text("Usage: /unsubscribe <player|club|month> [name]")
+        return
+
+    removed = await asyncio.to_thread(remove_subscription, update.effective_chat.id, kind, target.strip())
+    if removed:
+        await update.message.reply_text("🔕 Unsubscribed.")
     else:
-        await message.reply_text(f"❌ No data found for {player_name}")
+        await update.message.reply_text("❌ No matching subscription found.")
+
+async def subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    subscriptions = await asyncio.to_thread(get_subscriptions, update.effective_chat.id)
+    if not subscriptions:
+        await update.message.reply_text("You have no subscriptions. Try /subscribe month")
+        return
+
+    message = "*🔔 Your Subscriptions*\n\n"
+    for kind, target in subscriptions:
+        message += f"• {kind.capitalize()}: {target.title() if target else 'new monthly earnings'}\n"
+    await update.message.reply_text(message, parse_mode="Markdown")
+
+# ✅ /career Command
+async def career_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show a player's earnings in every archived season, or the career leaderboard."""
+    player_name = ' '.join(context.args)
+    try:
+        if not player_name:
+            leaders = await asyncio.to_thread(get_career_leaderboard, 0, ITEMS_PER_PAGE)
+            if not leaders:
+                await update.message.reply_text("❌ No season history available yet.")
+                return
+            message = "*🏆 Career Top Earners*\n_All archived seasons, in sTLOS_\n\n"
+            for i, player in enumerate(leaders, 1):
+                message += f"{i}. *{player['Player']}* - {player['Career']:,.2f}\n"
+            await update.message.reply_text(message, parse_mode="Markdown")
+            return
+
+        seasons = await asyncio.to_thread(get_career_earnings, player_name)
+        if not seasons:
+            await update.message.reply_text(f"❌ No season history found for {player_name}")
+            return
+
+        message = f"*🏆 {seasons[0]['player']} - Career Earnings*\n\n"
+        for row in seasons:
+            message += f"📅 {row['season']}: {row['total']:,.2f} sTLOS (#{row['rank']} of {row['players']})\n"
+        message += f"\n💰 Career total: {sum(row['total'] for row in seasons):,.2f} sTLOS"
+        await update.message.reply_text(message, parse_mode="Markdown")
+    except Exception as e:
+        logging.error(f"❌ Error in career_command: {e}")
+        await update.message.reply_text("❌ An error occurred while loading career earnings.")
+
+# ✅ /export Command
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send a whole table as one document, e.g. /export earnings csv club=Arsenal."""
+    args = list(context.args)
+    table = args.pop(0).lower() if args else ''
+    fmt = args.pop(0).lower() if args and args[0].lower() in EXPORT_FORMATS else 'csv'
+    field, value = None, None
+    if args:
+        name, _, value = ' '.join(args).partition('=')
+        field = EXPORT_FILTER_FIELDS.get(name.strip().lower())
+
+    if table not in EXPORT_TABLES or (args and (not field or not value.strip())):
+        await update.message.reply_text(
+            "Usage: /export <players|earnings> [csv|xlsx] [club=…|country=…|rarity=…]\n"
+            "Example: /export earnings csv club=Arsenal"
+        )
+        return
+    if fmt == 'xlsx' and not XLSX_AVAILABLE:
+        await update.message.reply_text("❌ XLSX export isn't available right now, please use csv.")
+        return
+
+    try:
+        key = await asyncio.to_thread(export_key, table, fmt, field, value)
+        file_id = get_cached_file_id(key)
+        if file_id:
+            try:
+                await update.message.reply_document(document=file_id)
+                return
+            except TelegramError:
+                forget_file_id(key)
+
+        await update.message.reply_chat_action(ChatAction.UPLOAD_DOCUMENT)
+        document, filename, rows = await asyncio.to_thread(build_export, table, fmt, field, value)
+        if not rows:
+            await update.message.reply_text("❌ No rows matched that filter.")
+            return
+        with document:
+            sent = await update.message.reply_document(
+                document=document, filename=filename, caption=f"📤 {EXPORT_TABLES[table]} - {rows} rows"
+            )
+        remember_file_id(key, sent.document.file_id)
+    except Exception as e:
+        logging.error(f"❌ Error in export_command: {e}")
+        await update.message.reply_text("❌ An error occurred while building the export.")
+
+# ✅ Admin Commands (restricted to ADMIN_USER_IDS)
+def admin_only(callback):
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not user or user.id not in ADMIN_USER_IDS:
+            logging.warning(f"⛔ Admin command refused for user {user.id if user else None}")
+            return
+        return await callback(update, context)
+    return wrapper
+
+@admin_only
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Sample the running bot for N seconds and send the folded stacks as a document."""
+    try:
+        seconds = int(context.args[0]) if context.args else 10
+    except ValueError:
+        await update.message.reply_text(f"Usage: /profile [seconds, max {MAX_PROFILE_SECONDS}]")
+        return
+
+    await update.message.reply_text(f"🔬 Profiling for {min(seconds, MAX_PROFILE_SECONDS)}s…")
+    result = await asyncio.to_thread(sample_stacks, seconds)
+    if result is None:
+        await update.message.reply_text("❌ A profile is already running.")
+        return
+
+    folded, stats = result
+    await update.message.reply_document(
+        document=io.BytesIO(folded.encode()),
+        filename="profile.folded",
+        caption=f"🔬 {stats['samples']} samples over {stats['seconds']}s (every {stats['interval_ms']}ms), "
+                f"sampler overhead {stats['overhead_pct']}%"
+    )
+
+@admin_only
+async def memsnap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Diff tracemalloc snapshots; the first call starts tracing, '/memsnap stop' ends it."""
+    if context.args and context.args[0].lower() == 'stop':
+        await asyncio.to_thread(stop_memory_tracing)
+        await update.message.reply_text("🧠 Memory tracing stopped.")
+        return
+
+    diff = await asyncio.to_thread(memory_diff)
+    if diff is None:
+        await update.message.reply_text("🧠 Memory tracing started. Run /memsnap again to see growth.")
+        return
+
+    user_data = context.application.user_data
+    listed = sum(len(data.get('players_list') or []) for data in user_data.values())
+    charts = get_chart_cache_info()
+    snapshots = await asyncio.to_thread(get_snapshot_info)
+    message = (
+        f"🧠 Traced: {diff['current'] / 1e6:.1f} MB (peak {diff['peak'] / 1e6:.1f} MB)\n"
+        f"👥 user_data: {len(user_data)} users, {listed} cached list entries\n"
+        f"📈 Chart cache: {charts['entries']} PNGs, {charts['bytes'] / 1e6:.1f} MB\n"
+        f"📤 Export cache: {get_export_cache_info()['file_ids']} file ids\n"
+        + "".join(
+            f"📄 {name} snapshot: {info['rows']} rows, {info['bytes'] / 1e6:.1f} MB\n"
+            for name, info in snapshots.items()
+        )
+        + "\nTop growth since last snapshot:\n" + "\n".join(diff['top'])
+    )
+    await update.message.reply_text(message[:4000])
+
+@admin_only
+async def cachestats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Dump data versions, cache sizes and shed-load counters."""
+    published = get_published()
+    stats = {
+        'snapshots': await asyncio.to_thread(get_snapshot_info),
+        'published': {
+            'version': published['version'],
+            'age_seconds': round(time.time() - published['published_at']),
+            'stage_timings': published['timings']
+        } if published else None,
+        'charts': get_chart_cache_info(),
+        'exports': get_export_cache_info(),
+        'alerts': await asyncio.to_thread(get_outbox_info),
+        'admission': get_admission_stats(),
+        'user_data': len(context.application.user_data)
+    }
+    await update.message.reply_text(json.dumps(stats, indent=1, default=str)[:4000])
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_message = (
@@ -417,6 +837,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "💰 */earnings* - View top earners (all-time and current season)\n"
         "📈 */chart <name>* - View player's earnings chart\n"
         "Example: /chart Lionel Messi\n\n"
+        "⚖️ */compare <name>, <name>, ...* - Compare up to 8 players in one chart\n"
+        "Example: /compare Lionel Messi, Cristiano Ronaldo\n"
+        "Use /compare grid ... for one panel per player\n\n"
+        "📊 */groupchart <rarity|club>* - Aggregate earnings per rarity tier or club\n"
+        "📊 */stats <club|country|rarity>* - Group totals, averages and top earners\n\n"
+        "🔔 */subscribe <player|club|month> [name]* - Get earnings alerts\n"
+        "🔕 */unsubscribe <player|club|month> [name]* - Stop an alert\n"
+        "📋 */subscriptions* - List your alerts\n\n"
+        "🏆 */career [name]* - A player's season-by-season earnings and ranks, or the career leaderboard\n\n"
+        "📤 */export <players|earnings> [csv|xlsx] [club=…]* - Download a whole table as one file\n"
+        "Example: /export earnings csv rarity=Legendary\n\n"
         "*Tips:*\n"
         "• Use exact player names for best results\n"
         "• Navigate through lists using ⬅️ Next/Previous ➡️ buttons\n"
@@ -424,27 +855,53 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await update.message.reply_text(help_message, parse_mode="Markdown")
 
+# ✅ Start Background Tasks
+async def post_init(application: Application):
+    start_pipeline()
+    application.create_task(asyncio.to_thread(ingest_closed_seasons))
+    application.create_task(run_alert_sender(application.bot))
+    application.create_task(poll_for_changes())
+
 # ✅ Initialize Bot
 def create_bot():
-    application = Application.builder().token(TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .persistence(SQLitePersistence())
+        .concurrent_updates(MAX_CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .build()
+    )
 
     # Commands
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("players", players_command))
-    application.add_handler(CommandHandler("player", player_command))
-    application.add_handler(CommandHandler("earnings", earnings_command))
-    application.add_handler(CommandHandler("chart", chart_command))
+    application.add_handler(CommandHandler("start", serialized(start_command)))
+    application.add_handler(CommandHandler("help", serialized(help_command)))
+    application.add_handler(CommandHandler("players", serialized(players_command)))
+    application.add_handler(CommandHandler("player", serialized(player_command)))
+    application.add_handler(CommandHandler("earnings", serialized(earnings_command)))
+    application.add_handler(CommandHandler("chart", serialized(chart_command)))
+    application.add_handler(CommandHandler("compare", serialized(compare_command)))
+    application.add_handler(CommandHandler("groupchart", serialized(groupchart_command)))
+    application.add_handler(CommandHandler("stats", serialized(stats_command)))
+    application.add_handler(CommandHandler("subscribe", serialized(subscribe_command)))
+    application.add_handler(CommandHandler("unsubscribe", serialized(unsubscribe_command)))
+    application.add_handler(CommandHandler("subscriptions", serialized(subscriptions_command)))
+    application.add_handler(CommandHandler("career", serialized(career_command)))
+    application.add_handler(CommandHandler("export", serialized(export_command)))
+    application.add_handler(CommandHandler("profile", serialized(profile_command)))
+    application.add_handler(CommandHandler("memsnap", serialized(memsnap_command)))
+    application.add_handler(CommandHandler("cachestats", serialized(cachestats_command)))
 
     # Callback Handlers
-    application.add_handler(CallbackQueryHandler(handle_filter_value_selection, pattern='^filter_.*_value_.*$'))
-    application.add_handler(CallbackQueryHandler(handle_sort_or_filter_selection, pattern='^(sort_|filter_(?!.*_value_).*)$'))
-    application.add_handler(CallbackQueryHandler(handle_player_selection, pattern='^player_.*$'))
-    application.add_handler(CallbackQueryHandler(handle_pagination, pattern='^(prev|next)_page_\d+$'))
-    application.add_handler(CallbackQueryHandler(handle_filter_pagination, pattern='^filter_[0-9]+$'))
-    application.add_handler(CallbackQueryHandler(handle_back_to_menu, pattern='^back_to_menu$'))
-    application.add_handler(CallbackQueryHandler(handle_earnings_list, pattern='^earnings_.*$'))
-    application.add_handler(CallbackQueryHandler(chart_command, pattern='^chart_.*$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_filter_value_selection, family='players'), pattern='^filter_.*_value_.*$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_sort_or_filter_selection, family='players'), pattern='^(sort_|filter_(?!.*_value_).*)$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_player_selection), pattern='^player_.*$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_pagination, family='players'), pattern='^(prev|next)_page_\d+$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_filter_pagination, family='players'), pattern='^filter_[0-9]+$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_back_to_menu, family='players'), pattern='^back_to_menu$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_earnings_list, family='earnings'), pattern='^earnings_.*$'))
+    application.add_handler(CallbackQueryHandler(admitted(chart_command), pattern='^chart_.*$'))
+    application.add_handler(CallbackQueryHandler(admitted(handle_stats_list, family='stats'), pattern='^stats_(club|country|rarity)_\d+$'))
 
     return application
 
@@ -472,18 +929,13 @@ async def handle_filter_pagination(update: Update, context: ContextTypes.DEFAULT
         page = int(query.data.split('_')[1])
         
         current_filter = context.user_data.get('current_filter')
-        field_map = {
-            'filter_club': 'Club',
-            'filter_rarity': 'Rarity',
-            'filter_country': 'Country'
-        }
         
-        field = field_map.get(current_filter)
+        field = FILTER_FIELDS.get(current_filter)
         if not field:
             await query.edit_message_text("❌ Invalid filter type.")
             return
 
-        options = get_unique_values(field)
+        options = await asyncio.to_thread(get_unique_values, field)
         if not options:
             await query.edit_message_text("❌ No options available.")
             return
@@ -492,8 +944,7 @@ async def handle_filter_pagination(update: Update, context: ContextTypes.DEFAULT
         context.user_data['current_filter_page'] = page
         await send_filter_options(update, context, options, page, field)
     except Exception as e:
-        logging.error(f"Error in handle_filter_pagination: {e}")
-        await query.edit_message_text("❌ An error occurred while paginating filters.")
+        await report_callback_error(query, e, 'handle_filter_pagination', "❌ An error occurred while paginating filters.")
 
 async def handle_view_chart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
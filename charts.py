@@ -0,0 +1,165 @@
+import io
+import logging
+import math
+import threading
+from collections import OrderedDict
+
+import matplotlib
+matplotlib.use("Agg")  # Headless backend, safe to render from worker threads
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+
+from google_sheets import get_earnings_matrix, get_sheet_snapshot, clean_data, CURRENT_SEASON
+
+# Constants
+MAX_COMPARE_PLAYERS = 8
+CHART_CACHE_SIZE = 64
+GROUP_FIELDS = {'rarity': 'Rarity', 'club': 'Club'}
+
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+
+# ✅ Chart Cache (keyed by player set + data version)
+def _cache_get(key):
+    with _chart_cache_lock:
+        png = _chart_cache.get(key)
+        if png is not None:
+            _chart_cache.move_to_end(key)
+        return png
+
+
+def _cache_put(key, png):
+    with _chart_cache_lock:
+        _chart_cache[key] = png
+        _chart_cache.move_to_end(key)
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def get_chart_cache_info():
+    with _chart_cache_lock:
+        return {'entries': len(_chart_cache), 'bytes': sum(len(png) for png in _chart_cache.values())}
+
+
+# ✅ Resolve Player Names Against the Earnings Matrix
+def resolve_players(names, matrix=None):
+    """Return (row indexes, canonical names, unknown names) for a case-insensitive name list."""
+    matrix = matrix or get_earnings_matrix()
+    lookup = {name.lower(): i for i, name in enumerate(matrix.players)}
+
+    indexes, found, missing = [], [], []
+    for name in names:
+        i = lookup.get(name.strip().lower())
+        if i is None:
+            missing.append(name.strip())
+        elif i not in indexes:
+            indexes.append(i)
+            found.append(matrix.players[i])
+    return indexes, found, missing
+
+
+# ✅ Player Charts (single player, overlay comparison or small multiples)
+def render_players_chart(player_names, layout='overlay', matrix=None):
+    """Render earnings per period for one or more players as PNG bytes in a BytesIO, or None."""
+    matrix = matrix or get_earnings_matrix()
+    indexes, found, _ = resolve_players(player_names[:MAX_COMPARE_PLAYERS], matrix)
+    if not indexes:
+        return None
+
+    key = ('players', tuple(sorted(found)), layout, matrix.version)
+    png = _cache_get(key)
+    if png is None:
+        series = matrix.values[indexes]  # (players, periods) in one slice
+        png = _draw_series(series, found, matrix.periods, layout)
+        _cache_put(key, png)
+        logging.info(f"📈 Rendered chart for {found} ({layout})")
+    return io.BytesIO(png)
+
+
+def _draw_series(series, labels, periods, layout):
+    x = np.arange(len(periods))
+
+    if len(labels) == 1 or layout == 'overlay':
+        fig = Figure(figsize=(12, 6))
+        ax = fig.add_subplot()
+        lines = ax.plot(x, series.T)
+        ax.set_xticks(x, periods, rotation=45, ha='right')
+        ax.set_ylabel('sTLOS')
+        if len(labels) == 1:
+            ax.set_title(f"{labels[0]}'s {CURRENT_SEASON} Season Earnings")
+        else:
+            ax.set_title(f"{CURRENT_SEASON} Season Earnings Comparison")
+            ax.legend(lines, labels)
+    else:
+        cols = min(2, len(labels))
+        rows = math.ceil(len(labels) / cols)
+        fig = Figure(figsize=(12, 3.5 * rows))
+        axes = fig.subplots(rows, cols, sharex=True, sharey=True, squeeze=False).ravel()
+        for ax, row, label in zip(axes, series, labels):
+            ax.plot(x, row)
+            ax.set_title(label)
+        for ax in axes[len(labels):]:
+            ax.set_visible(False)
+        for ax in axes[-cols:]:
+            ax.set_xticks(x, periods, rotation=45, ha='right')
+        fig.supylabel('sTLOS')
+
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+# ✅ Group Aggregate Charts (Rarity tiers or Clubs)
+def get_group_series(field):
+    """Sum per-period earnings by Rarity or Club; returns a DataFrame of groups x periods."""
+    matrix = get_earnings_matrix()
+    df = pd.DataFrame(matrix.values, columns=matrix.periods)
+
+    if field == 'Rarity':
+        keys = pd.Series(matrix.rarity)
+    else:
+        _, players_df = get_sheet_snapshot("Player List")
+        players_df = clean_data(players_df.copy())
+        club_by_player = dict(zip(players_df['Player'], players_df[field]))
+        keys = pd.Series([club_by_player.get(p, '') for p in matrix.players])
+
+    keep = (keys != '') & (~keys.str.contains('Retired', case=False, na=False))
+    return df[keep.to_numpy()].groupby(keys[keep].to_numpy()).sum(min_count=1)
+
+
+def render_group_chart(group, top_n=MAX_COMPARE_PLAYERS):
+    """Render aggregate earnings per period for each Rarity tier or the top clubs."""
+    field = GROUP_FIELDS.get(group.lower())
+    if not field:
+        return None
+
+    matrix = get_earnings_matrix()
+    key = ('group', field, top_n, matrix.version)
+    png = _cache_get(key)
+    if png is None:
+        grouped = get_group_series(field)
+        if grouped.empty:
+            return None
+        grouped = grouped.loc[grouped.sum(axis=1).nlargest(top_n).index]
+
+        fig = Figure(figsize=(12, 6))
+        ax = fig.add_subplot()
+        x = np.arange(len(matrix.periods))
+        lines = ax.plot(x, grouped.to_numpy().T)
+        ax.set_xticks(x, matrix.periods, rotation=45, ha='right')
+        ax.set_ylabel('sTLOS')
+        ax.set_title(f"{CURRENT_SEASON} Season Earnings by {field}")
+        ax.legend(lines, grouped.index.tolist())
+        fig.tight_layout()
+
+        png = _to_png(fig)
+        _cache_put(key, png)
+        logging.info(f"📈 Rendered {field} group chart")
+    return io.BytesIO(png)
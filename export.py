@@ -0,0 +1,118 @@
+import csv
+import io
+import logging
+import tempfile
+
+import pandas as pd
+
+from google_sheets import get_sheet_snapshot, get_earnings_matrix, clean_data
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX export is optional
+    Workbook = None
+
+XLSX_AVAILABLE = Workbook is not None
+
+# Constants
+EXPORT_TABLES = {'players': "Player List", 'earnings': "Earning Distribution"}
+EXPORT_FORMATS = ['csv', 'xlsx']
+EXPORT_FILTER_FIELDS = {'club': 'Club', 'country': 'Country', 'rarity': 'Rarity'}
+EXPORT_CHUNK_ROWS = 500
+EXPORT_MEMORY_LIMIT = 1024 * 1024  # Spill to a temp file beyond 1 MB
+
+_file_ids = {}  # export key -> Telegram file_id of the document already uploaded
+
+
+# ✅ Export Tables
+def _players_table():
+    _, df = get_sheet_snapshot("Player List")
+    return clean_data(df.loc[:, df.columns != ''].copy())
+
+
+def _earnings_table():
+    matrix = get_earnings_matrix()
+    df = pd.DataFrame(matrix.values, columns=matrix.periods).round(2)
+    df.insert(0, 'Rarity', matrix.rarity)
+    df.insert(0, 'Player', matrix.players)
+    return df
+
+
+def _apply_filter(df, field, value):
+    if not field:
+        return df
+    if field not in df.columns:
+        # Earnings rows only carry Rarity; look Club/Country up in 'Player List'
+        players = _players_table()
+        df = df.assign(**{field: df['Player'].map(dict(zip(players['Player'], players[field])))})
+    return df[df[field].astype(str).str.strip().str.lower() == value.strip().lower()]
+
+
+def _source_sheets(table, field):
+    sheets = [EXPORT_TABLES[table]]
+    if table == 'earnings' and field in ('Club', 'Country'):
+        sheets.append(EXPORT_TABLES['players'])  # _apply_filter looks these up in 'Player List'
+    return sheets
+
+
+def export_key(table, fmt, field=None, value=None):
+    """Cache key for an export; changes only when a sheet the export reads changes."""
+    versions = tuple(get_sheet_snapshot(name)[0] for name in _source_sheets(table, field))
+    return (table, fmt, field, (value or '').lower(), versions)
+
+
+def get_cached_file_id(key):
+    return _file_ids.get(key)
+
+
+def remember_file_id(key, file_id):
+    # Older data versions can never be requested again
+    for old_key in [k for k in _file_ids if k[:4] == key[:4]]:
+        del _file_ids[old_key]
+    _file_ids[key] = file_id
+
+
+def forget_file_id(key):
+    _file_ids.pop(key, None)
+
+
+def get_export_cache_info():
+    return {'file_ids': len(_file_ids)}
+
+
+# ✅ Incremental Writers (bounded memory: spooled to disk past EXPORT_MEMORY_LIMIT)
+def _write_csv(df, out):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(df.columns)
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        writer.writerows(df.iloc[start:start + EXPORT_CHUNK_ROWS].itertuples(index=False, name=None))
+    text.detach()  # Keep the underlying file open for sending
+
+
+def _write_xlsx(df, out):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        for row in df.iloc[start:start + EXPORT_CHUNK_ROWS].itertuples(index=False, name=None):
+            sheet.append([None if pd.isna(v) else v for v in row])
+    workbook.save(out)
+
+
+def build_export(table, fmt, field=None, value=None):
+    """Write the requested table to a spooled file; returns (file, filename, row count)."""
+    df = _players_table() if table == 'players' else _earnings_table()
+    df = _apply_filter(df, field, value)
+
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_MEMORY_LIMIT)
+    if fmt == 'xlsx':
+        _write_xlsx(df, out)
+    else:
+        _write_csv(df, out)
+    out.seek(0)
+
+    suffix = f"_{value.strip().replace(' ', '_')}" if field else ''
+    filename = f"mino_{table}{suffix}.{fmt}"
+    logging.info(f"📤 Built export {filename} ({len(df)} rows)")
+    return out, filename, len(df)
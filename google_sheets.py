@@ -3,7 +3,13 @@ import json
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
+import numpy as np
 import logging
+import storage
+import hashlib
+import threading
+import time
+from collections import namedtuple
 
 # ✅ Enable Logging
 logging.basicConfig(level=logging.INFO)
@@ -22,8 +28,21 @@ scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/au
 creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
 client = gspread.authorize(creds)
 
+# ✅ Season Registry (override with SEASONS_JSON when a new season starts)
+DEFAULT_SEASONS = {
+    "2024/25": {"spreadsheet": "Mino Football Earnings - 2024/25", "closed": False}
+}
+SEASONS = json.loads(os.getenv("SEASONS_JSON", "null")) or DEFAULT_SEASONS
+CURRENT_SEASON = os.getenv("CURRENT_SEASON") or next(
+    (name for name, season in SEASONS.items() if not season.get("closed")), list(SEASONS)[-1]
+)
+
+def open_season(season):
+    """Open the Google Spreadsheet registered for a season."""
+    return client.open(SEASONS[season]["spreadsheet"])
+
 # ✅ Open the Google Spreadsheet
-spreadsheet = client.open("Mino Football Earnings - 2024/25")
+spreadsheet = open_season(CURRENT_SEASON)
 player_list_sheet = spreadsheet.worksheet("Player List")
 
 logging.info("✅ Successfully connected to Google Sheets.")
@@ -35,12 +54,176 @@ def clean_data(df):
         df[col] = df[col].astype(str).str.strip().str.replace('\u200b', '')  # Remove zero-width spaces
     return df
 
+# ✅ Sheet Snapshots (one download shared by every view until the TTL expires)
+SNAPSHOT_TTL_SECONDS = int(os.getenv("SNAPSHOT_TTL_SECONDS", "300"))
+
+# Rows below this index in 'Earning Distribution' hold payout totals, not players
+EARNINGS_PLAYER_ROWS = 153
+EARNINGS_NON_PERIOD_COLUMNS = ['Player', 'Total', 'Ballon d\'Or', 'Rarity']
+
+_snapshots = {}
+_snapshot_locks = {}  # One lock per sheet, so a slow download never blocks readers of another sheet
+_store_lock = threading.Lock()
+_refresh_listeners = []
+
+def register_refresh_listener(callback):
+    """Call callback(sheet_name, version) whenever a worksheet snapshot changes."""
+    _refresh_listeners.append(callback)
+
+def _notify_refresh(sheet_name, version):
+    for callback in _refresh_listeners:
+        try:
+            callback(sheet_name, version)
+        except Exception as e:
+            logging.error(f"❌ Refresh listener {callback.__name__} failed: {e}")
+
+_snapshot_store = storage.connect()
+storage.init_schema(_snapshot_store, [
+    "DROP TABLE IF EXISTS sheet_snapshots",  # Superseded by the per-season table below
+    """CREATE TABLE IF NOT EXISTS season_snapshots (
+        season TEXT NOT NULL,
+        sheet_name TEXT NOT NULL,
+        version TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        snapshot_values TEXT NOT NULL,
+        PRIMARY KEY (season, sheet_name)
+    )"""
+])
+
+def _load_stored_snapshot(sheet_name):
+    """Reuse the snapshot persisted before a restart if it is still within the TTL."""
+    with _store_lock:
+        row = _snapshot_store.execute(
+            "SELECT version, fetched_at, snapshot_values FROM season_snapshots WHERE season = ? AND sheet_name = ?",
+            (CURRENT_SEASON, sheet_name)
+        ).fetchone()
+    if row and time.time() - row['fetched_at'] < SNAPSHOT_TTL_SECONDS:
+        return row['version'], row['fetched_at'], json.loads(row['snapshot_values'])
+    return None
+
+def _store_snapshot(sheet_name, version, fetched_at, values):
+    with _store_lock, _snapshot_store:
+        _snapshot_store.execute(
+            "INSERT OR REPLACE INTO season_snapshots (season, sheet_name, version, fetched_at, snapshot_values)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (CURRENT_SEASON, sheet_name, version, fetched_at, json.dumps(values))
+        )
+
+def _touch_stored_snapshot(sheet_name, fetched_at):
+    # Unchanged data: only refresh the timestamp instead of rewriting the whole sheet
+    with _store_lock, _snapshot_store:
+        _snapshot_store.execute(
+            "UPDATE season_snapshots SET fetched_at = ? WHERE season = ? AND sheet_name = ?",
+            (fetched_at, CURRENT_SEASON, sheet_name)
+        )
+
+def get_sheet_snapshot(sheet_name, force=False):
+    """Return (data_version, DataFrame) for a worksheet, re-fetching at most once per TTL."""
+    with _snapshot_locks.setdefault(sheet_name, threading.Lock()):
+        cached = _snapshots.get(sheet_name)
+        now = time.time()
+        if cached and not force and now - cached['fetched_at'] < SNAPSHOT_TTL_SECONDS:
+            return cached['version'], cached['df']
+
+        stored = _load_stored_snapshot(sheet_name) if not cached and not force else None
+        if stored:
+            version, now, values = stored
+            logging.info(f"♻️ Restored snapshot of '{sheet_name}' from local store")
+        else:
+            values = spreadsheet.worksheet(sheet_name).get_all_values()
+            version = hashlib.sha1(json.dumps(values).encode()).hexdigest()[:12]
+            if cached and cached['version'] == version:
+                _touch_stored_snapshot(sheet_name, now)
+            else:
+                _store_snapshot(sheet_name, version, now, values)
+
+        if cached and cached['version'] == version:
+            cached['fetched_at'] = now
+            return version, cached['df']
+
+        header, rows = (values[0], values[1:]) if values else ([], [])
+        df = pd.DataFrame(rows, columns=header)
+        _snapshots[sheet_name] = {'version': version, 'fetched_at': now, 'df': df}
+        logging.info(f"✅ Loaded snapshot of '{sheet_name}' (version {version}, {len(df)} rows)")
+
+    # Listeners run outside the lock so they can read other snapshots
+    _notify_refresh(sheet_name, version)
+    return version, df
+
+def get_cached_snapshot(sheet_name):
+    """Return the in-memory (version, DataFrame) of a worksheet without ever fetching; (None, None) if not loaded.
+
+    Refresh listeners use this: calling get_sheet_snapshot from a listener can start a nested fetch.
+    """
+    cached = _snapshots.get(sheet_name)
+    return (cached['version'], cached['df']) if cached else (None, None)
+
+def get_snapshot_info():
+    """Data version, age, row count and memory size of every cached worksheet snapshot."""
+    now = time.time()
+    return {
+        name: {
+            'version': cached['version'],
+            'age_seconds': round(now - cached['fetched_at']),
+            'rows': len(cached['df']),
+            'bytes': int(cached['df'].memory_usage(deep=True).sum())
+        }
+        for name, cached in list(_snapshots.items())
+    }
+
+# ✅ Parsed Earnings Matrix (players x periods)
+EarningsMatrix = namedtuple('EarningsMatrix', ['version', 'players', 'periods', 'values', 'rarity'])
+
+_earnings_matrix = None
+
+def get_period_columns(columns):
+    """Return the per-period earnings columns, stopping at the first blank header."""
+    periods = []
+    for col in columns:
+        if col in EARNINGS_NON_PERIOD_COLUMNS:
+            continue
+        if pd.isna(col) or str(col).strip() == '':  # Stop at blank column
+            break
+        periods.append(col)
+    return periods
+
+def get_earnings_matrix(snapshot=None):
+    """Parse 'Earning Distribution' into a float matrix, re-parsing only when the data version changes.
+
+    snapshot is an optional (version, DataFrame) to parse instead of the current snapshot.
+    """
+    global _earnings_matrix
+    version, df = snapshot or get_sheet_snapshot("Earning Distribution")
+    if _earnings_matrix is None or _earnings_matrix.version != version:
+        _earnings_matrix = build_earnings_matrix(version, df)
+        logging.info(f"✅ Parsed earnings matrix: {_earnings_matrix.values.shape[0]} players x {_earnings_matrix.values.shape[1]} periods")
+    return _earnings_matrix
+
+def build_earnings_matrix(version, df):
+    """Build an EarningsMatrix from a raw 'Earning Distribution' DataFrame (any season)."""
+    df = df.iloc[:EARNINGS_PLAYER_ROWS]
+    df = df.loc[:, ~df.columns.duplicated()]
+    players = df['Player'].astype(str).str.strip().str.replace('\u200b', '', regex=False)
+    df = df[players != ''].copy()
+    players = players[players != '']
+
+    periods = get_period_columns(df.columns.tolist())
+    values = (
+        df[periods].astype(str)
+        .replace(r'[^\d.]', '', regex=True)
+        .apply(pd.to_numeric, errors='coerce')
+        .to_numpy(dtype=np.float64)
+    )
+    rarity = df['Rarity'].astype(str).str.strip().tolist() if 'Rarity' in df.columns else [''] * len(df)
+    return EarningsMatrix(version, players.tolist(), periods, values, rarity)
+
 # ✅ Get Active Players (Excluding Retired)
-def get_all_players():
+def get_all_players(df=None):
     """Retrieve all active players, ensuring data is clean and sorted."""
     try:
-        records = player_list_sheet.get_all_records()
-        df = pd.DataFrame(records)
+        if df is None:
+            _, df = get_sheet_snapshot("Player List")
+        df = df.copy()  # The snapshot is shared, never clean it in place
 
         if df.empty:
             logging.error("❌ Retrieved empty dataframe from sheets")
@@ -105,9 +288,9 @@ def get_players_by_filter(field, value):
     return players
 
 # ✅ Get Unique Filter Values (Club, Country, Rarity)
-def get_unique_values(field):
+def get_unique_values(field, df=None):
     """Retrieve unique values for Club, Rarity, or Country, excluding 'Retired'."""
-    df = get_all_players()
+    df = get_all_players(df)
 
     if df.empty:
         logging.error(f"No data found when retrieving unique values for {field}")
@@ -131,8 +314,8 @@ def get_unique_values(field):
 # ✅ Get Retired Players
 def get_retired_players():
     """Retrieve retired players."""
-    df = pd.DataFrame(player_list_sheet.get_all_records())
-    df = clean_data(df)
+    _, df = get_sheet_snapshot("Player List")
+    df = clean_data(df.copy())
 
     retired_players = df[
         (df['Club'].str.contains('Retired', case=False, na=False)) |
@@ -143,12 +326,12 @@ def get_retired_players():
     return retired_players
 
 # ✅ Get March 2025 Earnings
-def get_march_earnings(page=0, items_per_page=10):
+def get_march_earnings(page=0, items_per_page=10, df=None):
     """Retrieve top earners for March 2025 from the 'Earning Distribution' sheet, ignoring rows 155+."""
     try:
-        earnings_sheet = spreadsheet.worksheet("Earning Distribution")
-        expected_headers = ['Player', 'March']
-        df = pd.DataFrame(earnings_sheet.get_all_records(expected_headers=expected_headers))
+        if df is None:
+            _, df = get_sheet_snapshot("Earning Distribution")
+        df = df.loc[:, ~df.columns.duplicated()].copy()  # Blank headers repeat in this sheet
 
         if "March" not in df.columns:
             logging.error("❌ 'March' column not found in the sheet.")
@@ -232,8 +415,8 @@ def get_january_earnings(page=0, items_per_page=10):
 # ✅ Get Player Information
 def get_player_info(player_name):
     """Retrieve player details and NFT video link."""
-    df = pd.DataFrame(player_list_sheet.get_all_records())
-    df = clean_data(df)
+    _, df = get_sheet_snapshot("Player List")
+    df = clean_data(df.copy())
 
     # Case-insensitive search for player
     player_data = df[df["Player"].str.strip().str.lower() == player_name.strip().lower()]
@@ -243,10 +426,14 @@ def get_player_info(player_name):
         return None
 
     info = player_data.iloc[0]
+    logging.info(f"✅ Player info retrieved for: {info['Player']}")
+    return format_player_info(info, df.columns)
 
-    # ✅ Handle 2024/25 Earnings Column
-    earnings_2024_25_column = [col for col in df.columns if "2024/25" in col and "sTLOS" in col]
-    earnings_2024_25 = info.get(earnings_2024_25_column[0], 'N/A') if earnings_2024_25_column else 'N/A'
+def format_player_info(info, columns):
+    """Build the player card text and NFT video link from a cleaned 'Player List' row."""
+    # ✅ Handle Current Season Earnings Column
+    season_column = [col for col in columns if CURRENT_SEASON in col and "sTLOS" in col]
+    season_earnings = info.get(season_column[0], 'N/A') if season_column else 'N/A'
 
     info_text = (
         f"🔹 *{info['Player']}* 🔹\n"
@@ -255,61 +442,18 @@ def get_player_info(player_name):
         f"🏟️ Club: {info['Club']}\n"
         f"🌍 Country: {info['Country']}\n"
         f"💰 Total Earnings: {info['Total Earnings']}\n"
-        f"💼 2024/25 Earnings: {earnings_2024_25} sTLOS"
+        f"💼 {CURRENT_SEASON} Earnings: {season_earnings} sTLOS"
     )
 
     # ✅ Get NFT Video Link
     video_link = info.get("LINK", None)
-
-    logging.info(f"✅ Player info retrieved for: {info['Player']}")
     return info_text, video_link
 
-def get_player_earnings_chart(player_name):
-    """Generate a line chart of player earnings over time."""
-    earnings_sheet = client.open("Mino Football Earnings - 2024/25").worksheet("Earning Distribution")
-    df = pd.DataFrame(earnings_sheet.get_all_records())
-
-    # Get player's row
-    player_data = df[df['Player'] == player_name]
-    if player_data.empty:
-        return None
-
-    # Get weekly columns up to the blank column
-    all_columns = df.columns.tolist()
-    weekly_columns = []
-    for col in all_columns:
-        if col in ['Player', 'Total', 'Ballon d\'Or', 'Rarity']:
-            continue
-        if pd.isna(col) or col.strip() == '':  # Stop at blank column
-            break
-        weekly_columns.append(col)
-
-    # Convert values to numeric
-    earnings = player_data[weekly_columns].iloc[0].apply(pd.to_numeric, errors='coerce')
-
-    # Create chart
-    import matplotlib.pyplot as plt
-    plt.figure(figsize=(12, 6))
-    plt.plot(range(len(earnings)), earnings.values)
-    plt.xticks(range(len(earnings)), earnings.index, rotation=45, ha='right')
-
-    plt.title(f"{player_name}'s 2024/25 Season Earnings")
-    plt.ylabel('sTLOS')
-    plt.grid(False)  # Remove gridlines
-    plt.tight_layout()
-
-    # Save to bytes
-    import io
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    return buf
-
-def get_top_earners(page=0, items_per_page=10):
+def get_top_earners(page=0, items_per_page=10, df=None):
     """Retrieve top earners of all time sorted by Total Earnings."""
-    df = pd.DataFrame(player_list_sheet.get_all_records())
-    df = clean_data(df)
+    if df is None:
+        _, df = get_sheet_snapshot("Player List")
+    df = clean_data(df.copy())
 
     # Convert Total Earnings to numeric, removing any currency symbols
     df['Total Earnings'] = pd.to_numeric(df['Total Earnings'].str.replace(r'[^\d.]', '', regex=True), errors='coerce')
@@ -326,13 +470,11 @@ def get_top_earners(page=0, items_per_page=10):
 
     return df.iloc[start:end][['Player', 'Total Earnings', 'Club', 'Country']].to_dict('records')
 
-def get_current_season_earners(page=0, items_per_page=10):
+def get_current_season_earners(page=0, items_per_page=10, df=None):
     """Retrieve top earners for current season based on Total minus Ballon d'Or."""
-    earnings_sheet = client.open("Mino Football Earnings - 2024/25").worksheet("Earning Distribution")
-
-    # Specify expected headers to handle duplicates
-    expected_headers = ['Player', 'Total minus Ballon d\'Or', 'January', 'February', 'March']
-    df = pd.DataFrame(earnings_sheet.get_all_records(expected_headers=expected_headers))
+    if df is None:
+        _, df = get_sheet_snapshot("Earning Distribution")
+    df = df.loc[:, ~df.columns.duplicated()].copy()  # Blank headers repeat in this sheet
 
     # Clean only Player column
     df['Player'] = df['Player'].astype(str).str.strip().str.replace('\u200b', '')
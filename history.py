@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from google_sheets import (
+    SEASONS,
+    CURRENT_SEASON,
+    open_season,
+    build_earnings_matrix,
+    get_cached_snapshot,
+    get_earnings_matrix,
+    register_refresh_listener
+)
+
+# ✅ Columnar History Store
+# history/<season>/v_<n>/manifest.json + one period_NNN.npy column (players,) per period,
+# read back with mmap so cross-season queries never load whole seasons into RAM.
+# history/<season>/CURRENT names the live v_<n> directory and is swapped atomically.
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+KEEP_VERSIONS = 2  # The previous version stays readable for requests that already loaded its manifest
+
+_totals_cache = {}  # season -> (version, totals)
+_write_lock = threading.Lock()
+
+
+def _season_dir(season):
+    return os.path.join(HISTORY_DIR, season.replace('/', '-'))
+
+
+def _prune_versions(directory):
+    versions = sorted(name for name in os.listdir(directory) if name.startswith('v_'))
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def _replace_file(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_season(season, matrix, closed=False):
+    """Write a season into a fresh version directory, then switch CURRENT to it in one rename."""
+    directory = _season_dir(season)
+    with _write_lock:
+        version_name = f"v_{time.time_ns()}"
+        version_dir = os.path.join(directory, version_name)
+        os.makedirs(version_dir)
+        for j in range(len(matrix.periods)):
+            np.save(os.path.join(version_dir, f"period_{j:03d}.npy"), np.ascontiguousarray(matrix.values[:, j]))
+
+        manifest = {
+            'season': season,
+            'version': matrix.version,
+            'closed': closed,
+            'players': matrix.players,
+            'periods': matrix.periods,
+            'ingested_at': time.time()
+        }
+        with open(os.path.join(version_dir, "manifest.json"), 'w') as f:
+            json.dump(manifest, f)
+        _replace_file(os.path.join(directory, "CURRENT"), lambda f: f.write(version_name.encode()))
+        _prune_versions(directory)
+    logging.info(f"🗄️ Archived {season}: {len(matrix.players)} players x {len(matrix.periods)} periods")
+
+
+def load_manifest(season):
+    """Return the live manifest of a season; its 'directory' pins the column files to the same version."""
+    directory = _season_dir(season)
+    pointer = os.path.join(directory, "CURRENT")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        version_dir = os.path.join(directory, f.read().strip())
+    with open(os.path.join(version_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    manifest['directory'] = version_dir
+    return manifest
+
+
+def load_period(manifest, index):
+    """Memory-map one period column of the version a manifest describes."""
+    return np.load(os.path.join(manifest['directory'], f"period_{index:03d}.npy"), mmap_mode='r')
+
+
+def archived_seasons():
+    return [season for season in SEASONS if load_manifest(season)]
+
+
+# ✅ Ingestion
+def ingest_closed_seasons():
+    """Fetch each closed season once; archived closed seasons are never fetched from Google again."""
+    for season, config in SEASONS.items():
+        if not config.get("closed"):
+            continue
+        manifest = load_manifest(season)
+        if manifest and manifest['closed']:
+            continue
+        try:
+            values = open_season(season).worksheet("Earning Distribution").get_all_values()
+            df = pd.DataFrame(values[1:], columns=values[0])
+            write_season(season, build_earnings_matrix(f"closed-{season}", df), closed=True)
+        except Exception as e:
+            logging.error(f"❌ Error archiving season {season}: {e}")
+
+
+def _on_refresh(sheet_name, version):
+    if sheet_name != "Earning Distribution":
+        return
+    matrix = get_earnings_matrix(get_cached_snapshot("Earning Distribution"))
+    manifest = load_manifest(CURRENT_SEASON)
+    if manifest and (manifest['closed'] or manifest['version'] == matrix.version):
+        return
+    write_season(CURRENT_SEASON, matrix)
+
+
+register_refresh_listener(_on_refresh)
+
+
+# ✅ Cross-Season Queries
+def get_season_totals(season):
+    """Return (manifest, totals) for a season, summing memory-mapped period columns one at a time."""
+    manifest = load_manifest(season)
+    if manifest is None:
+        return None, None
+
+    cached = _totals_cache.get(season)
+    if cached and cached[0] == manifest['version']:
+        return manifest, cached[1]
+
+    totals = np.zeros(len(manifest['players']))
+    for j in range(len(manifest['periods'])):
+        totals += np.nan_to_num(load_period(manifest, j))
+    _totals_cache[season] = (manifest['version'], totals)  # Only the latest version per season is kept
+    return manifest, totals
+
+
+def get_career_earnings(player_name):
+    """Return per-season totals and ranks for a player across every archived season."""
+    seasons = []
+    for season in archived_seasons():
+        manifest, totals = get_season_totals(season)
+        lookup = {name.lower(): i for i, name in enumerate(manifest['players'])}
+        i = lookup.get(player_name.strip().lower())
+        if i is None:
+            continue
+        seasons.append({
+            'season': season,
+            'player': manifest['players'][i],
+            'total': round(float(totals[i]), 2),
+            'rank': int((totals > totals[i]).sum()) + 1,
+            'players': len(totals)
+        })
+    return seasons
+
+
+def get_career_leaderboard(page=0, items_per_page=10):
+    """Retrieve top career earners summed over every archived season."""
+    career = pd.Series(dtype=np.float64)
+    for season in archived_seasons():
+        manifest, totals = get_season_totals(season)
+        season_totals = pd.Series(totals, index=manifest['players']).groupby(level=0).sum()
+        career = career.add(season_totals, fill_value=0.0)
+
+    career = career.sort_values(ascending=False).round(2)
+    start = page * items_per_page
+    page_rows = career.iloc[start:start + items_per_page]
+    return [{'Player': player, 'Career': total} for player, total in page_rows.items()]
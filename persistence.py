@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import threading
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+import storage
+
+# Rebuildable lists are dropped; the 'players_source' cursor is enough to recreate them
+TRANSIENT_USER_KEYS = {'players_list', 'filter_options'}
+FLUSH_DELAY_SECONDS = 2.0
+
+
+# ✅ SQLite Persistence (write-behind, compact cursors only)
+class SQLitePersistence(BasePersistence):
+    """Persist user/chat/bot data to the local store so restarts keep pagination state."""
+
+    def __init__(self, update_interval=60, flush_delay=FLUSH_DELAY_SECONDS):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self._conn = storage.connect()
+        storage.init_schema(self._conn, [
+            """CREATE TABLE IF NOT EXISTS persistence (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (kind, key)
+            )"""
+        ])
+        self._flush_delay = flush_delay
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_task = None
+
+    # Loading (cheap: no Sheets access, lists are rebuilt lazily on first use)
+    def _load(self, kind):
+        rows = self._conn.execute("SELECT key, value FROM persistence WHERE kind = ?", (kind,)).fetchall()
+        return {int(row['key']): json.loads(row['value']) for row in rows}
+
+    async def get_user_data(self):
+        data = await asyncio.to_thread(self._load, 'user')
+        logging.info(f"♻️ Restored state for {len(data)} users")
+        return data
+
+    async def get_chat_data(self):
+        return await asyncio.to_thread(self._load, 'chat')
+
+    async def get_bot_data(self):
+        row = await asyncio.to_thread(
+            lambda: self._conn.execute("SELECT value FROM persistence WHERE kind = 'bot'").fetchone()
+        )
+        return json.loads(row['value']) if row else {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        # The bot has no ConversationHandlers
+        return {}
+
+    # Write-behind buffer: updates are coalesced and committed in one transaction
+    def _queue(self, kind, key, value):
+        with self._pending_lock:
+            self._pending[(kind, str(key))] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._flush_delay)
+        await self.flush()
+
+    def _commit(self, pending):
+        with self._conn:
+            for (kind, key), value in pending.items():
+                if value is None:
+                    self._conn.execute("DELETE FROM persistence WHERE kind = ? AND key = ?", (kind, key))
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO persistence (kind, key, value) VALUES (?, ?, ?)", (kind, key, value)
+                    )
+
+    async def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            await asyncio.to_thread(self._commit, pending)
+            logging.info(f"💾 Persisted {len(pending)} state entries")
+
+    async def update_user_data(self, user_id, data):
+        compact = {k: v for k, v in data.items() if k not in TRANSIENT_USER_KEYS}
+        self._queue('user', user_id, json.dumps(compact, default=str))
+
+    async def update_chat_data(self, chat_id, data):
+        self._queue('chat', chat_id, json.dumps(data, default=str))
+
+    async def update_bot_data(self, data):
+        self._queue('bot', '', json.dumps(data, default=str))
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def drop_user_data(self, user_id):
+        self._queue('user', user_id, None)
+
+    async def drop_chat_data(self, chat_id):
+        self._queue('chat', chat_id, None)
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
@@ -0,0 +1,262 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import google_sheets
+from google_sheets import (
+    get_sheet_snapshot,
+    get_earnings_matrix,
+    register_refresh_listener,
+    clean_data,
+    format_player_info,
+    SNAPSHOT_TTL_SECONDS
+)
+from charts import render_players_chart
+from trends import update_trends
+
+# Constants
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+WARM_CHART_COUNT = 10
+ALL_ROWS = 10 ** 6  # items_per_page large enough to return every row
+FILTER_FIELDS = ['Club', 'Country', 'Rarity']
+SOURCE_SHEETS = ["Player List", "Earning Distribution"]
+OPTIONAL_STAGES = {'build_trends', 'render_top_charts'}  # Their views are also built on demand
+PIPELINE_RETRY_SECONDS = int(os.getenv("PIPELINE_RETRY_SECONDS", "60"))
+
+_published = None  # Swapped as a whole, so readers never see a half-built view set
+_run_lock = threading.Lock()
+_rerun_requested = threading.Event()
+_freshness_lock = threading.Lock()
+
+
+# ✅ Stages (each receives the results of the stages it depends on)
+def parse_players(results):
+    version, df = get_sheet_snapshot("Player List")
+    return {'version': version, 'raw': df, 'df': clean_data(df.copy())}
+
+
+def parse_earnings(results):
+    # Matrix and raw rows must come from the same snapshot version
+    version, df = get_sheet_snapshot("Earning Distribution")
+    return {'version': version, 'raw': df, 'matrix': get_earnings_matrix((version, df))}
+
+
+def build_indexes(results):
+    raw = results['parse_players']['raw']
+    df = results['parse_players']['df']
+    return {
+        'rows_by_name': {name.lower(): i for i, name in reversed(list(enumerate(df['Player'])))},
+        'unique_values': {field: google_sheets.get_unique_values(field, raw) for field in FILTER_FIELDS}
+    }
+
+
+def build_leaderboards(results):
+    players = results['parse_players']['raw']
+    earnings = results['parse_earnings']['raw']
+    march = google_sheets.get_march_earnings(0, ALL_ROWS, earnings)
+    payout_note = march[-1] if march and 'payout_note' in march[-1] else None
+    return {
+        'alltime': google_sheets.get_top_earners(0, ALL_ROWS, players),
+        'current': google_sheets.get_current_season_earners(0, ALL_ROWS, earnings),
+        'march': [row for row in march if 'payout_note' not in row],
+        'march_note': payout_note
+    }
+
+
+def build_trends(results):
+    return update_trends(results['parse_earnings']['matrix'])
+
+
+def render_messages(results):
+    df = results['parse_players']['df']
+    rows_by_name = results['build_indexes']['rows_by_name']
+    return {name: format_player_info(df.iloc[i], df.columns) for name, i in rows_by_name.items()}
+
+
+def render_top_charts(results):
+    matrix = results['parse_earnings']['matrix']
+    top = [row['Player'] for row in results['build_leaderboards']['current'][:WARM_CHART_COUNT]]
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="warm-start-chart") as pool:
+        rendered = list(pool.map(lambda name: render_players_chart([name], matrix=matrix) is not None, top))
+    return sum(rendered)
+
+
+# name -> (dependencies, function)
+STAGES = {
+    'parse_players': ([], parse_players),
+    'parse_earnings': ([], parse_earnings),
+    'build_indexes': (['parse_players'], build_indexes),
+    'build_leaderboards': (['parse_players', 'parse_earnings'], build_leaderboards),
+    'build_trends': (['parse_earnings'], build_trends),
+    'render_messages': (['parse_players', 'build_indexes'], render_messages),
+    'render_top_charts': (['parse_earnings', 'build_leaderboards'], render_top_charts)
+}
+
+
+# ✅ Scheduler (runs every stage as soon as its dependencies finish)
+def run_pipeline():
+    """Run all stages, then publish the new views in a single swap.
+
+    A failed core stage aborts the run; a failed optional stage publishes None in its place.
+    """
+    global _published
+    started = time.perf_counter()
+    results, timings, futures = {}, {}, {}
+
+    def timed(name, func):
+        stage_start = time.perf_counter()
+        try:
+            result = func(results)
+        except Exception as e:
+            if name not in OPTIONAL_STAGES:
+                raise
+            logging.error(f"❌ Optional pipeline stage {name} failed: {e}")
+            result = None
+        timings[name] = round(time.perf_counter() - stage_start, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="warm-start-stage") as pool:
+        pending = dict(STAGES)
+        while pending or futures:
+            for name, (deps, func) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    futures[pool.submit(timed, name, func)] = name
+                    del pending[name]
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures.pop(future)] = future.result()  # A failed core stage aborts the run
+
+    version = (results['parse_players']['version'], results['parse_earnings']['version'])
+    _published = {
+        'version': version,
+        'published_at': time.time(),
+        'checked_at': time.time(),
+        'timings': timings,
+        'indexes': results['build_indexes'],
+        'leaderboards': results['build_leaderboards'],
+        'matrix': results['parse_earnings']['matrix'],
+        'player_info': results['render_messages']
+    }
+    logging.info(f"🚀 Published data version {version} in {time.perf_counter() - started:.2f}s, stages: {timings}")
+
+
+def _schedule_retry():
+    timer = threading.Timer(PIPELINE_RETRY_SECONDS, start_pipeline)
+    timer.daemon = True
+    timer.start()
+
+
+def _run_until_current():
+    # Coalesce refreshes that land while a run is in progress into one follow-up run
+    while True:
+        _rerun_requested.clear()
+        try:
+            run_pipeline()
+        except Exception as e:
+            logging.error(f"❌ Warm-start pipeline failed, retrying in {PIPELINE_RETRY_SECONDS}s: {e}")
+            if not _rerun_requested.is_set():
+                _schedule_retry()
+        if _rerun_requested.is_set():
+            continue
+        _run_lock.release()
+        # A refresh landing between the check above and the release could not take the lock; run for it here
+        if not _rerun_requested.is_set() or not _run_lock.acquire(blocking=False):
+            return
+
+
+def start_pipeline():
+    """Kick off a background run, or queue a re-run if one is already going."""
+    _rerun_requested.set()
+    if _run_lock.acquire(blocking=False):
+        threading.Thread(target=_run_until_current, name="warm-start", daemon=True).start()
+
+
+def _on_refresh(sheet_name, version):
+    # Snapshots loaded by the pipeline's own stages are already part of the run
+    if threading.current_thread().name.startswith("warm-start"):
+        return
+    if sheet_name in SOURCE_SHEETS:
+        start_pipeline()
+
+
+register_refresh_listener(_on_refresh)
+
+
+def get_published():
+    return _published
+
+
+def _check_freshness():
+    # A changed version notifies the refresh listeners, which start a new run
+    try:
+        for sheet_name in SOURCE_SHEETS:
+            get_sheet_snapshot(sheet_name)
+    except Exception as e:
+        logging.error(f"❌ Freshness check failed: {e}")
+    finally:
+        _freshness_lock.release()
+
+
+def _current():
+    """Return the published views; once they are older than the snapshot TTL, re-check the sheets in the background."""
+    published = _published
+    if (published is not None and time.time() - published['checked_at'] >= SNAPSHOT_TTL_SECONDS
+            and _freshness_lock.acquire(blocking=False)):
+        published['checked_at'] = time.time()
+        threading.Thread(target=_check_freshness, name="freshness-check", daemon=True).start()
+    return published
+
+
+# ✅ Warm Views (same signatures as google_sheets, served from the published data)
+def _page(rows, page, items_per_page):
+    start = page * items_per_page
+    return rows[start:start + items_per_page]
+
+
+def get_top_earners(page=0, items_per_page=10):
+    published = _current()
+    if published is None:
+        return google_sheets.get_top_earners(page, items_per_page)
+    return _page(published['leaderboards']['alltime'], page, items_per_page)
+
+
+def get_current_season_earners(page=0, items_per_page=10):
+    published = _current()
+    if published is None:
+        return google_sheets.get_current_season_earners(page, items_per_page)
+    return [dict(row) for row in _page(published['leaderboards']['current'], page, items_per_page)]
+
+
+def get_march_earnings(page=0, items_per_page=10):
+    published = _current()
+    if published is None:
+        return google_sheets.get_march_earnings(page, items_per_page)
+    records = _page(published['leaderboards']['march'], page, items_per_page)
+    note = published['leaderboards']['march_note']
+    return records + [note] if records and note else records
+
+
+def get_unique_values(field):
+    published = _current()
+    if published is None or field not in published['indexes']['unique_values']:
+        return google_sheets.get_unique_values(field)
+    return published['indexes']['unique_values'][field]
+
+
+def get_player_info(player_name):
+    published = _current()
+    if published is None:
+        return google_sheets.get_player_info(player_name)
+    info = published['player_info'].get(player_name.strip().lower())
+    if info is None:
+        logging.warning(f"⚠️ No data found for player: {player_name}")
+    return info
+
+
+def get_trends():
+    # Cheap once build_trends has warmed them; also keeps the week-over-week movement current
+    published = _current()
+    return update_trends(published['matrix'] if published else None)
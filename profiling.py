@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Constants
+SAMPLE_INTERVAL_SECONDS = 0.01  # Shortest gap between samples
+MAX_OVERHEAD_PCT = 5  # Sampling slows down with many or deep threads to stay under this
+MAX_PROFILE_SECONDS = 120
+MAX_STACK_DEPTH = 64
+MEMORY_TRACE_FRAMES = 5
+
+_profile_lock = threading.Lock()
+_memory_baseline = None
+
+
+# ✅ Sampling Profiler (folded stacks, ready for flamegraph.pl or speedscope)
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(seconds, interval=SAMPLE_INTERVAL_SECONDS):
+    """Sample every thread's stack for N seconds; returns (folded stacks text, stats) or None if busy."""
+    # Nothing is hooked into running code: cost is one capped stack walk per thread per sample,
+    # and the gap after each sample grows with its cost so the sampler stays under MAX_OVERHEAD_PCT
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        me = threading.get_ident()
+        counts = Counter()
+        samples, sampling_time = 0, 0.0
+        started = time.monotonic()
+        deadline = started + seconds
+
+        while time.monotonic() < deadline:
+            tick = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[';'.join(reversed(stack))] += 1
+            cost = time.perf_counter() - tick
+            samples += 1
+            sampling_time += cost
+            time.sleep(max(interval, cost * (100 / MAX_OVERHEAD_PCT - 1)))
+
+        elapsed = time.monotonic() - started
+        folded = '\n'.join(f"{stack} {count}" for stack, count in counts.most_common())
+        stats = {
+            'seconds': round(elapsed, 1),
+            'samples': samples,
+            'interval_ms': round(1000 * elapsed / samples, 1),
+            'overhead_pct': round(100 * sampling_time / elapsed, 2)
+        }
+        return folded, stats
+    finally:
+        _profile_lock.release()
+
+
+# ✅ Memory Snapshots (tracemalloc diff against the previous snapshot)
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def memory_diff(limit=15):
+    """Start tracing on the first call; afterwards return the top allocation growth since the last call."""
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+    if _memory_baseline is None:
+        # Also covers tracing started elsewhere (e.g. PYTHONTRACEMALLOC) before the first call
+        _memory_baseline = _take_snapshot()
+        return None
+
+    snapshot = _take_snapshot()
+    stats = snapshot.compare_to(_memory_baseline, 'lineno')[:limit]
+    _memory_baseline = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return {'current': current, 'peak': peak, 'top': [str(stat) for stat in stats]}
+
+
+def stop_memory_tracing():
+    global _memory_baseline
+    _memory_baseline = None
+    tracemalloc.stop()
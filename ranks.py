@@ -0,0 +1,77 @@
+import logging
+
+import numpy as np
+
+# ✅ Incremental Rank Arrays
+# Cumulative season rank per player per period; columns are kept sorted so a refresh
+# only moves the rows that changed instead of re-sorting every period.
+# Pure numpy, so it can be exercised without a spreadsheet connection.
+
+
+def _count_greater(sorted_values, x):
+    return len(sorted_values) - np.searchsorted(sorted_values, x, side='right')
+
+
+def rank_column(column):
+    """Return (sorted values, 1-based ranks) for one column; ties share the best rank."""
+    sorted_values = np.sort(column)
+    return sorted_values, 1 + _count_greater(sorted_values, column)
+
+
+def update_column(sorted_values, ranks, old_column, new_column, changed):
+    """Swap the changed rows' values inside the sorted column and adjust ranks in place."""
+    old_values = np.sort(old_column[changed])
+    new_values = np.sort(new_column[changed])
+
+    # Remove old values (offsets keep duplicates from hitting the same slot), insert new ones
+    remove_at = np.searchsorted(sorted_values, old_values, side='left')
+    remove_at += np.arange(len(old_values)) - np.searchsorted(old_values, old_values, side='left')
+    remaining = np.delete(sorted_values, remove_at)
+    sorted_values = np.insert(remaining, np.searchsorted(remaining, new_values), new_values)
+
+    # Unchanged rows only move by how many changed rows crossed them
+    unchanged = ~changed
+    x = new_column[unchanged]
+    ranks[unchanged] += _count_greater(new_values, x) - _count_greater(old_values, x)
+    ranks[changed] = 1 + _count_greater(sorted_values, new_column[changed])
+    return sorted_values
+
+
+def rebuild(matrix, cumulative):
+    """Rank every period column from scratch."""
+    ranks = np.empty(cumulative.shape, dtype=np.int64)
+    sorted_columns = []
+    for j in range(cumulative.shape[1]):
+        sorted_values, ranks[:, j] = rank_column(cumulative[:, j])
+        sorted_columns.append(sorted_values)
+    return {'players': matrix.players, 'periods': matrix.periods, 'cumulative': cumulative,
+            'ranks': ranks, 'sorted': sorted_columns}
+
+
+def apply_refresh(old, matrix):
+    """Return rank state for a matrix, updating only changed rows of the previous state where possible."""
+    cumulative = np.cumsum(np.nan_to_num(matrix.values), axis=1)
+    if (old is None or old['players'] != matrix.players
+            or matrix.periods[:len(old['periods'])] != old['periods']):
+        logging.info(f"📊 Built rank arrays for {len(matrix.players)} players x {len(matrix.periods)} periods")
+        return rebuild(matrix, cumulative)
+
+    ranks = np.empty(cumulative.shape, dtype=np.int64)
+    sorted_columns = []
+    changed_rows = 0
+    for j in range(cumulative.shape[1]):
+        if j >= len(old['periods']):
+            sorted_values, ranks[:, j] = rank_column(cumulative[:, j])  # Newly published period
+        else:
+            ranks[:, j] = old['ranks'][:, j]
+            sorted_values = old['sorted'][j]
+            changed = cumulative[:, j] != old['cumulative'][:, j]
+            if changed.any():
+                changed_rows += int(changed.sum())
+                sorted_values = update_column(sorted_values, ranks[:, j], old['cumulative'][:, j],
+                                              cumulative[:, j], changed)
+        sorted_columns.append(sorted_values)
+
+    logging.info(f"📊 Updated ranks incrementally ({changed_rows} changed cells)")
+    return {'players': matrix.players, 'periods': matrix.periods, 'cumulative': cumulative,
+            'ranks': ranks, 'sorted': sorted_columns}
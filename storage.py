@@ -0,0 +1,21 @@
+import os
+import sqlite3
+
+# ✅ Local SQLite Store (subscriptions, outbox, bot state)
+DB_PATH = os.getenv("BOT_DB_PATH", "bot_data.sqlite3")
+
+
+def connect():
+    """Open a connection to the local store; WAL lets the sender and handlers write concurrently."""
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_schema(conn, statements):
+    """Create tables/indexes if they don't exist yet."""
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+import numpy as np
+
+from ranks import apply_refresh, rebuild
+
+Matrix = namedtuple('Matrix', ['players', 'periods', 'values'])
+
+
+def _random_matrix(rng, players, periods):
+    # Small integers so ties are common; NaN is an unpublished cell
+    values = rng.integers(0, 4, size=(len(players), len(periods))).astype(float)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return Matrix(players, periods, values)
+
+
+def _assert_matches_rebuild(state, matrix):
+    expected = rebuild(matrix, np.cumsum(np.nan_to_num(matrix.values), axis=1))
+    np.testing.assert_array_equal(state['ranks'], expected['ranks'])
+    for got, want in zip(state['sorted'], expected['sorted'], strict=True):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_incremental_ranks_match_full_rebuild():
+    rng = np.random.default_rng(34)
+    for _ in range(2000):
+        players = [f"p{i}" for i in range(int(rng.integers(1, 12)))]
+        periods = [f"m{j}" for j in range(int(rng.integers(1, 5)))]
+        matrix = _random_matrix(rng, players, periods)
+        state = apply_refresh(None, matrix)
+
+        for _ in range(3):
+            values = matrix.values.copy()
+            changed = rng.random(values.shape) < 0.3
+            values[changed] = rng.integers(0, 4, size=int(changed.sum()))
+            if rng.random() < 0.3:  # A new period gets published
+                periods = periods + [f"m{len(periods)}"]
+                values = np.hstack([values, rng.integers(0, 4, size=(len(players), 1)).astype(float)])
+            matrix = Matrix(players, periods, values)
+            state = apply_refresh(state, matrix)
+            _assert_matches_rebuild(state, matrix)
+
+
+def test_ties_share_the_best_rank():
+    matrix = Matrix(['a', 'b', 'c', 'd'], ['m0'], np.array([[5.0], [7.0], [5.0], [np.nan]]))
+    state = apply_refresh(None, matrix)
+    assert state['ranks'][:, 0].tolist() == [2, 1, 2, 4]
+
+    matrix = Matrix(matrix.players, matrix.periods, np.array([[5.0], [5.0], [9.0], [np.nan]]))
+    state = apply_refresh(state, matrix)
+    assert state['ranks'][:, 0].tolist() == [2, 2, 1, 4]
+
+
+def test_changed_roster_rebuilds():
+    matrix = Matrix(['a', 'b'], ['m0'], np.array([[1.0], [2.0]]))
+    state = apply_refresh(None, matrix)
+    matrix = Matrix(['a', 'b', 'c'], ['m0'], np.array([[1.0], [2.0], [3.0]]))
+    _assert_matches_rebuild(apply_refresh(state, matrix), matrix)
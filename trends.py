@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+import storage
+from google_sheets import get_earnings_matrix, CURRENT_SEASON
+from ranks import apply_refresh
+
+# Constants
+HOT_COUNT = 3  # Top earners of the latest period get 🔥
+MOVERS_COUNT = 5
+WEEK_SECONDS = 7 * 24 * 60 * 60
+WEEK_RECHECK_SECONDS = 60 * 60  # Week-over-week movement ages even while the sheet is unchanged
+
+# Rank arrays are kept up to date incrementally by ranks.apply_refresh.
+# Periods are calendar months, so month-over-month movement is the change between the
+# last two published periods. Week-over-week movement compares the season rank with the
+# checkpoint stored at least a week earlier.
+_state = None
+_trends = None
+_lock = threading.Lock()
+
+_conn = storage.connect()
+if 'season' not in {row['name'] for row in _conn.execute("PRAGMA table_info(rank_checkpoints)")}:
+    with _conn:  # Checkpoints taken before they were keyed by season can't be attributed to one
+        _conn.execute("DROP TABLE IF EXISTS rank_checkpoints")
+storage.init_schema(_conn, [
+    """CREATE TABLE IF NOT EXISTS rank_checkpoints (
+        season TEXT NOT NULL,
+        version TEXT NOT NULL,
+        taken_at REAL NOT NULL,
+        ranks TEXT NOT NULL,
+        PRIMARY KEY (season, version)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_rank_checkpoints_taken_at ON rank_checkpoints (season, taken_at)"
+])
+
+
+# ✅ Week-over-Week Checkpoints
+def _week_baseline(version, season_ranks, now):
+    """Store this version's season ranks; return (taken_at, ranks) of the newest checkpoint a week old, or None."""
+    with _conn:
+        _conn.execute("DELETE FROM rank_checkpoints WHERE season != ?", (CURRENT_SEASON,))
+        _conn.execute(
+            "INSERT OR IGNORE INTO rank_checkpoints (season, version, taken_at, ranks) VALUES (?, ?, ?, ?)",
+            (CURRENT_SEASON, version, now, json.dumps(season_ranks))
+        )
+        row = _conn.execute(
+            "SELECT taken_at, ranks FROM rank_checkpoints WHERE season = ? AND taken_at <= ?"
+            " ORDER BY taken_at DESC LIMIT 1",
+            (CURRENT_SEASON, now - WEEK_SECONDS)
+        ).fetchone()
+        if row:
+            # Older checkpoints can never be a baseline again
+            _conn.execute(
+                "DELETE FROM rank_checkpoints WHERE season = ? AND taken_at < ?", (CURRENT_SEASON, row['taken_at'])
+            )
+    return (row['taken_at'], json.loads(row['ranks'])) if row else None
+
+
+# ✅ Trends (movement, streaks, hot players)
+def _derive_trends(matrix, ranks):
+    values = np.nan_to_num(matrix.values)
+    published = np.flatnonzero(values.any(axis=0))
+    if not len(published):
+        return {'version': matrix.version, 'period': None, 'previous': None, 'week_since': None,
+                'week_checked_at': None, 'players': {}}
+
+    latest = published[-1]
+    previous = latest - 1 if latest > 0 else latest
+    change = ranks[:, previous] - ranks[:, latest]  # Positive = moved up
+
+    # Streak: consecutive periods moving in the same direction as the latest move
+    direction = np.sign(change)
+    streak = np.where(direction != 0, 1, 0)
+    running = direction != 0
+    for k in range(previous, 0, -1):
+        running &= np.sign(ranks[:, k - 1] - ranks[:, k]) == direction
+        streak += running
+
+    top = np.argsort(-values[:, latest])[:HOT_COUNT]
+    hot = set(top[values[top, latest] > 0].tolist())
+    players = {}
+    for i, name in enumerate(matrix.players):
+        players[name.lower()] = {
+            'player': name,
+            'rank': int(ranks[i, latest]),
+            'month_change': int(change[i]),
+            'week_change': None,
+            'streak': int(streak[i] * direction[i]),
+            'hot': i in hot
+        }
+    return {
+        'version': matrix.version,
+        'period': matrix.periods[latest],
+        'previous': matrix.periods[previous],
+        'week_since': None,
+        'week_checked_at': None,
+        'players': players
+    }
+
+
+def _with_week_movement(trends, now):
+    """Return trends with week-over-week movement measured against the checkpoint a week before now."""
+    if not trends['players']:
+        return dict(trends, week_checked_at=now)
+    season_ranks = {key: row['rank'] for key, row in trends['players'].items()}
+    baseline = _week_baseline(trends['version'], season_ranks, now)
+    week_since, week_ranks = baseline if baseline else (None, {})
+    players = {}
+    for key, row in trends['players'].items():
+        week_rank = week_ranks.get(key)
+        players[key] = dict(row, week_change=week_rank - row['rank'] if week_rank is not None else None)
+    return dict(trends, week_since=week_since, week_checked_at=now, players=players)
+
+
+def update_trends(matrix=None):
+    """Bring rank arrays and trends up to date with the latest earnings matrix."""
+    global _state, _trends
+    matrix = matrix or get_earnings_matrix()
+    with _lock:
+        now = time.time()
+        if _trends is None or _trends['version'] != matrix.version:
+            _state = apply_refresh(_state, matrix)
+            _trends = _with_week_movement(_derive_trends(matrix, _state['ranks']), now)
+        elif now - _trends['week_checked_at'] >= WEEK_RECHECK_SECONDS:
+            _trends = _with_week_movement(_trends, now)
+        return _trends
+
+
+def trend_marker(trends, player_name):
+    """Return '🔥', '⬆️', '⬇️' (or a combination) for a player, by month-over-month season rank movement."""
+    trend = trends['players'].get(str(player_name).strip().lower())
+    if not trend:
+        return ''
+    marker = '🔥' if trend['hot'] else ''
+    if trend['month_change'] > 0:
+        marker += '⬆️'
+    elif trend['month_change'] < 0:
+        marker += '⬇️'
+    return marker
+
+
+def get_biggest_movers(trends, window='month', count=MOVERS_COUNT):
+    """Return (risers, fallers) by 'month' or 'week' season rank movement."""
+    key = f"{window}_change"
+    rows = [r for r in trends['players'].values() if r[key]]
+    risers = sorted((r for r in rows if r[key] > 0), key=lambda r: (-r[key], r['rank']))[:count]
+    fallers = sorted((r for r in rows if r[key] < 0), key=lambda r: (r[key], r['rank']))[:count]
+    return risers, fallers